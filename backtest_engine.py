@@ -0,0 +1,277 @@
+# python backtest_engine.py
+# Checks simulate_positions against the original iterrows loop and reports bars per second.
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from indicators import consecutive_streaks
+
+LONG_ENTRY, LONG_EXIT, SHORT_ENTRY, SHORT_EXIT = 0, 1, 2, 3
+TRADE_TYPES = ('Long Entry', 'Long Exit', 'Short Entry', 'Short Exit')
+FLAT, LONG, SHORT = 0, 1, -1
+
+def next_true(flags):
+    """ For each bar, the index of the first True at or after it (len(flags) if none). """
+    flags = np.asarray(flags, dtype=bool)
+    n = len(flags)
+    positions = np.where(flags, np.arange(n), n)
+    # Reverse running minimum gives the nearest True to the right
+    return np.minimum.accumulate(positions[::-1])[::-1].tolist() + [n]
+
+def simulate_positions(close, long_entry, long_exit, short_entry=None, short_exit=None, balance=0.0, on_exit=None):
+    """
+    One market's position state machine, the same rules as the scripts' iterrows loop:
+    on each bar an open position is closed first on its exit signal, then a flat market
+    opens a long (preferred) or short on its entry signal.
+
+    Instead of visiting every bar the loop jumps straight to the next bar whose signal can
+    change the state, so the Python work is proportional to the number of trades.
+    Returns (events, balance) with events as (bar, action, price, profit, balance) tuples.
+    on_exit(bar, balance) is called after every closed trade, it may raise to abort the run.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    long_entry = np.asarray(long_entry, dtype=bool)
+    short_entry = np.zeros(n, dtype=bool) if short_entry is None else np.asarray(short_entry, dtype=bool)
+    short_exit = np.zeros(n, dtype=bool) if short_exit is None else np.asarray(short_exit, dtype=bool)
+
+    next_entry = next_true(long_entry | short_entry)
+    next_long_exit = next_true(long_exit)
+    next_short_exit = next_true(short_exit)
+    prices = close.tolist()
+
+    events = []
+    position = FLAT
+    entry_price = 0.0
+    t = 0
+    while t < n:
+        if position == FLAT:
+            t = next_entry[t]
+            if t >= n:
+                break
+            entry_price = prices[t]
+            if long_entry[t]:
+                position = LONG
+                events.append((t, LONG_ENTRY, entry_price, 0, balance))
+            else:
+                position = SHORT
+                events.append((t, SHORT_ENTRY, entry_price, 0, balance))
+            # Exits are only checked from the next bar on
+            t += 1
+        elif position == LONG:
+            t = next_long_exit[t]
+            if t >= n:
+                break
+            profit = prices[t] - entry_price
+            balance += profit
+            events.append((t, LONG_EXIT, prices[t], profit, balance))
+            # Stay on this bar, a new position may open on the same close
+            position = FLAT
+            if on_exit is not None:
+                on_exit(t, balance)
+        else:
+            t = next_short_exit[t]
+            if t >= n:
+                break
+            profit = entry_price - prices[t]
+            balance += profit
+            events.append((t, SHORT_EXIT, prices[t], profit, balance))
+            position = FLAT
+            if on_exit is not None:
+                on_exit(t, balance)
+    return events, balance
+
+def simulate_positions_batch(close, long_entry, long_exit, short_entry, short_exit, balance=0.0):
+    """
+    simulate_positions for many parameter sets at once on one market. Signals are
+    (bars x parameter sets) boolean arrays and balance a scalar or one value per set;
+    every set's state advances together bar by bar. Returns the final balances.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    num_sets = long_entry.shape[1]
+    balances = np.array(np.broadcast_to(np.asarray(balance, dtype=np.float64), (num_sets,)))
+    position = np.zeros(num_sets, dtype=np.int8)
+    entry_price = np.zeros(num_sets)
+    any_signal = (long_entry | long_exit | short_entry | short_exit).any(axis=1)
+
+    for t in np.flatnonzero(any_signal):
+        price = close[t]
+        closing_long = (position == LONG) & long_exit[t]
+        closing_short = (position == SHORT) & short_exit[t]
+        if closing_long.any():
+            balances[closing_long] += price - entry_price[closing_long]
+            position[closing_long] = FLAT
+        if closing_short.any():
+            balances[closing_short] += entry_price[closing_short] - price
+            position[closing_short] = FLAT
+
+        flat = position == FLAT
+        opening_long = flat & long_entry[t]
+        opening_short = flat & ~long_entry[t] & short_entry[t]
+        position[opening_long] = LONG
+        position[opening_short] = SHORT
+        entry_price[opening_long | opening_short] = price
+    return balances
+
+def leg_masks(events, n):
+    """
+    Entry bars of a single-leg simulation and the bars its open position blocks the other
+    leg: from the entry bar up to, not including, the exit bar (or the end if never closed).
+    """
+    entries = np.zeros(n, dtype=bool)
+    held = np.zeros(n, dtype=bool)
+    open_bar = None
+    for bar, action, _, _, _ in events:
+        if action in (LONG_ENTRY, SHORT_ENTRY):
+            entries[bar] = True
+            open_bar = bar
+        else:
+            held[open_bar:bar] = True
+            open_bar = None
+    if open_bar is not None:
+        held[open_bar:] = True
+    return entries, held
+
+def legs_compatible(long_masks, short_masks):
+    """
+    True when the long-only and short-only simulations never meet, in which case the full
+    simulation makes exactly their trades and its profit is the sum of the two legs'.
+
+    Proof sketch, by induction over the bars: if no short entry falls on a bar a long holds
+    (its entry bar included) and no long entry on a bar a short holds, then on every bar the
+    full simulation is flat exactly when both legs are flat, and long (short) exactly when the
+    long (short) leg is. Exits are checked first, so a leg closing on a bar frees it for the
+    other leg's entry on that same bar in both simulations.
+    """
+    long_entries, long_held = long_masks
+    short_entries, short_held = short_masks
+    return not ((long_entries & short_held).any() or (short_entries & long_held).any())
+
+def merge_legs(long_events, short_events):
+    """ The trades of two compatible legs in full-simulation order, exits before entries on a shared bar. """
+    exits = (LONG_EXIT, SHORT_EXIT)
+    return sorted(long_events + short_events, key=lambda event: (event[0], event[1] not in exits))
+
+def trade_records(dates, market, events):
+    """ Convert events to the (date, market, trade type, price, profit, balance) tuples plot_results expects. """
+    return [(dates[bar], market, TRADE_TYPES[action], price, profit, balance) for bar, action, price, profit, balance in events]
+
+def simulate_market_iterrows(df, market, balance):
+    """ The original per-row loop, kept as the parity reference. """
+    trades = []
+    position = None
+    for date, row in df.iterrows():
+        price = row['Close']
+        if position:
+            trade_type, entry_price = position
+            if trade_type == 'Long' and row['LongExit']:
+                profit = price - entry_price
+                balance += profit
+                trades.append((date, market, 'Long Exit', price, profit, balance))
+                position = None
+            elif trade_type == 'Short' and row['ShortExit']:
+                profit = entry_price - price
+                balance += profit
+                trades.append((date, market, 'Short Exit', price, profit, balance))
+                position = None
+        if not position:
+            if row['LongEntry']:
+                position = ('Long', price)
+                trades.append((date, market, 'Long Entry', price, 0, balance))
+            elif row['ShortEntry']:
+                position = ('Short', price)
+                trades.append((date, market, 'Short Entry', price, 0, balance))
+    return trades, balance
+
+def random_signal_frame(num_bars, density, rng):
+    dates = pd.date_range('2000-01-01', periods=num_bars, name='Date')
+    df = pd.DataFrame({'Close': 100 * np.exp(np.cumsum(rng.normal(0, 0.01, num_bars)))}, index=dates)
+    for column in ('LongEntry', 'LongExit', 'ShortEntry', 'ShortExit'):
+        df[column] = rng.random(num_bars) < density
+    return df
+
+def check_parity(num_cases=50, num_bars=2000, seed=0):
+    """ Compare simulate_positions with the iterrows loop on random signals of varying density. """
+    rng = np.random.default_rng(seed)
+    for case in range(num_cases):
+        df = random_signal_frame(num_bars, rng.uniform(0.01, 0.6), rng)
+        expected, expected_balance = simulate_market_iterrows(df, 'TEST', 10000)
+        events, balance = simulate_positions(df['Close'], df['LongEntry'], df['LongExit'], df['ShortEntry'], df['ShortExit'], 10000)
+        if trade_records(df.index, 'TEST', events) != expected or balance != expected_balance:
+            raise AssertionError(f"simulate_positions differs from the iterrows loop in case {case}")
+    return num_cases
+
+def check_batch_parity(num_sets=64, num_bars=2000, seed=0):
+    """ Compare simulate_positions_batch with one simulate_positions call per parameter set. """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, num_bars)))
+    density = rng.uniform(0.01, 0.6, num_sets)
+    signals = [rng.random((num_bars, num_sets)) < density for _ in range(4)]
+    balances = simulate_positions_batch(close, *signals, balance=10000)
+    for j in range(num_sets):
+        _, expected = simulate_positions(close, *(signal[:, j] for signal in signals), balance=10000)
+        if balances[j] != expected:
+            raise AssertionError(f"simulate_positions_batch differs from simulate_positions for set {j}")
+    return num_sets
+
+def check_separable_parity(num_cases=200, num_bars=2000, seed=0):
+    """
+    Simulate the long and short legs of random consecutive-close signals separately. Whenever
+    legs_compatible holds, the full simulation must make the same trades and end on the summed
+    profit. Returns (compatible cases, incompatible cases).
+    """
+    rng = np.random.default_rng(seed)
+    compatible = 0
+    for case in range(num_cases):
+        # Rounded prices give some flat closes, which break both streaks
+        close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.01, num_bars))), 1)
+        up, down = consecutive_streaks(close)
+        le, lx, se, sx = rng.integers(1, 6, 4)
+        band = rng.random((2, num_bars)) < rng.uniform(0.2, 1.0)
+        long_entry, long_exit = (up >= le) & band[0], down >= lx
+        short_entry, short_exit = (down >= se) & band[1], up >= sx
+        no_signal = np.zeros(num_bars, dtype=bool)
+        long_events, long_profit = simulate_positions(close, long_entry, long_exit)
+        short_events, short_profit = simulate_positions(close, no_signal, no_signal, short_entry, short_exit)
+        if not legs_compatible(leg_masks(long_events, num_bars), leg_masks(short_events, num_bars)):
+            continue
+        compatible += 1
+        events, balance = simulate_positions(close, long_entry, long_exit, short_entry, short_exit, 10000)
+        expected = [event[:4] for event in merge_legs(long_events, short_events)]
+        if [event[:4] for event in events] != expected or not np.isclose(balance, 10000 + long_profit + short_profit, rtol=0, atol=1e-9):
+            raise AssertionError(f"separate legs differ from the full simulation in case {case}")
+    return compatible, num_cases - compatible
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Backtest engine parity check and throughput")
+
+    parser.add_argument("--cases", "-c", type=int, default=50, help="Random parity cases")
+    parser.add_argument("--bars", "-b", type=int, default=5000000, help="Bars for the throughput run")
+    parser.add_argument("--density", "-d", type=float, default=0.05, help="Signal density for the throughput run")
+
+    args = parser.parse_args()
+
+    return args
+
+def main():
+    args = parse_arguments()
+    print(f"Parity: {check_parity(args.cases)} random cases identical to the iterrows loop")
+    print(f"Batch parity: {check_batch_parity()} parameter sets identical to simulate_positions")
+    compatible, incompatible = check_separable_parity()
+    print(f"Separable parity: {compatible} cases with non-overlapping legs identical to the full simulation ({incompatible} overlapping skipped)")
+
+    rng = np.random.default_rng(1)
+    df = random_signal_frame(20000, args.density, rng)
+    start = time.perf_counter()
+    simulate_market_iterrows(df, 'TEST', 10000)
+    iterrows_rate = len(df) / (time.perf_counter() - start)
+
+    df = random_signal_frame(args.bars, args.density, rng)
+    arrays = [df[column].to_numpy() for column in ('Close', 'LongEntry', 'LongExit', 'ShortEntry', 'ShortExit')]
+    start = time.perf_counter()
+    events, _ = simulate_positions(*arrays, balance=10000)
+    engine_rate = len(df) / (time.perf_counter() - start)
+    print(f"iterrows: {iterrows_rate:,.0f} bars/s, simulate_positions: {engine_rate:,.0f} bars/s ({len(events)} trades, {engine_rate / iterrows_rate:.0f}x)")
+
+if __name__ == '__main__':
+    main()
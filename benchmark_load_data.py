@@ -0,0 +1,70 @@
+# python benchmark_load_data.py -n 5000 -w 8
+# Generates a MarketData-style directory and times sequential vs parallel load_data.
+import os
+import time
+import shutil
+import tempfile
+import argparse
+import numpy as np
+import pandas as pd
+from market_data import load_data
+
+def generate_market_directory(directory, num_files=5000, num_rows=6000, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2000-01-03', periods=num_rows).strftime('%d/%m/%Y')
+    for i in range(num_files):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, num_rows)))
+        df = pd.DataFrame({
+            'Date': dates,
+            'Open': close * (1 + rng.normal(0, 0.002, num_rows)),
+            'High': close * 1.01,
+            'Low': close * 0.99,
+            'Close': close,
+            'Adj Close': close,
+            'Volume': rng.integers(1000, 1000000, num_rows),
+        })
+        df.to_csv(os.path.join(directory, f'SYM{i:05d}.csv'), index=False, float_format='%.6f')
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark MarketData ingestion")
+
+    parser.add_argument("--num_files", "-n", type=int, default=5000, help="Number of generated CSV files")
+    parser.add_argument("--num_rows", "-r", type=int, default=6000, help="Rows per generated CSV file")
+    parser.add_argument("--workers", "-w", type=int, default=0, help="Worker processes for the parallel run, 0 = all cores")
+    parser.add_argument("--directory", "-d", default=None, help="Reuse an existing generated directory")
+
+    args = parser.parse_args()
+
+    return args
+
+def main():
+    args = parse_arguments()
+    directory = args.directory or tempfile.mkdtemp(prefix='marketdata_bench_')
+    generated = args.directory is None
+
+    try:
+        if generated:
+            start = time.perf_counter()
+            generate_market_directory(directory, args.num_files, args.num_rows)
+            print(f"Generated {args.num_files} files in {time.perf_counter() - start:.1f}s: {directory}")
+
+        start = time.perf_counter()
+        sequential = load_data(directory, use_cache=False)
+        sequential_time = time.perf_counter() - start
+        print(f"Sequential: {len(sequential)} files in {sequential_time:.2f}s")
+
+        workers = args.workers or os.cpu_count()
+        start = time.perf_counter()
+        parallel = load_data(directory, use_cache=False, workers=workers)
+        parallel_time = time.perf_counter() - start
+        print(f"Parallel ({workers} workers): {len(parallel)} files in {parallel_time:.2f}s, speedup {sequential_time / parallel_time:.2f}x")
+
+        mismatched = [symbol for symbol in sequential if not sequential[symbol].equals(parallel[symbol])]
+        if mismatched:
+            print(f"Mismatched frames: {mismatched[:10]}")
+    finally:
+        if generated:
+            shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
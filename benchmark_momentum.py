@@ -0,0 +1,52 @@
+# python benchmark_momentum.py -d 6000 -n 100 1000 5000
+# Times the per-market calculate_momentum_and_ma loop against the panel-level momentum_and_ma.
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from indicators import momentum_and_ma
+
+def calculate_momentum_and_ma(data, window=14):
+    for market, df in data.items():
+        df['Momentum'] = df['Close'].diff(window)
+        df['MA'] = df['Close'].rolling(window=window).mean()
+    return data
+
+def generate_close_matrix(num_dates, num_symbols, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (num_dates, num_symbols)), axis=0))
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark momentum and MA over many symbols")
+
+    parser.add_argument("--dates", "-d", type=int, default=6000, help="Number of dates")
+    parser.add_argument("--symbols", "-n", type=int, nargs='+', default=[100, 1000, 5000], help="Symbol counts to time")
+    parser.add_argument("--window", "-w", type=int, default=14, help="Momentum and MA window")
+
+    args = parser.parse_args()
+
+    return args
+
+def main():
+    args = parse_arguments()
+    dates = pd.date_range('2000-01-01', periods=args.dates, name='Date')
+
+    print(f"{'symbols':>8} {'per-market (s)':>15} {'panel (s)':>10} {'speedup':>8} {'max |diff|':>11}")
+    for num_symbols in args.symbols:
+        close = generate_close_matrix(args.dates, num_symbols)
+        market_data = {f'SYM{j:05d}': pd.DataFrame({'Close': close[:, j]}, index=dates) for j in range(num_symbols)}
+
+        start = time.perf_counter()
+        calculate_momentum_and_ma(market_data, args.window)
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        momentum, ma, highest = momentum_and_ma(close, args.window)
+        panel_time = time.perf_counter() - start
+
+        reference = np.column_stack([df['MA'].to_numpy() for df in market_data.values()])
+        max_diff = np.nanmax(np.abs(ma - reference))
+        print(f"{num_symbols:>8} {loop_time:>15.3f} {panel_time:>10.3f} {loop_time / panel_time:>7.1f}x {max_diff:>11.2e}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# python benchmark_search.py -s 0.1 -b 200 400
+# Best profit found and CPU seconds: exhaustive Bollinger grid against TPE and random search with a budget
+# and coarse-to-fine std dev refinement.
+import time
+import argparse
+import numpy as np
+from itertools import product
+from market_data import load_data
+from consecutive_closes_bb_opt import build_parameter_grid, build_parameter_space, optimize_strategy_tpe, refine_std_devs, simulate_trades_batch, synchronize_start_dates
+
+def grid_profits(market_data, parameter_grid, batch_size=512):
+    profits = np.empty(len(parameter_grid))
+    for i in range(0, len(parameter_grid), batch_size):
+        profits[i:i + batch_size] = simulate_trades_batch(market_data, parameter_grid[i:i + batch_size])
+    return profits
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark TPE and random search against the exhaustive grid")
+
+    parser.add_argument("--startday", default="2020-01-01", help="start day, ex: 2024-04-24")
+    parser.add_argument("--step_size", "-s", type=float, default=0.1, help="Bollinger std dev step")
+    parser.add_argument("--coarse_step", "-c", type=float, default=None, help="first std dev step of the refinement, step_size times a power of two (default 4 x step_size)")
+    parser.add_argument("--budgets", "-b", type=int, nargs='+', default=[100, 200, 400], help="TPE evaluation budgets to time")
+    parser.add_argument("--seeds", type=int, default=3, help="runs per budget and method")
+
+    args = parser.parse_args()
+
+    return args
+
+def main():
+    args = parse_arguments()
+    market_data = synchronize_start_dates(load_data("MarketData"), args.startday)
+    space = dict(bollinger_std_dev_lower_range=(1, 3), bollinger_std_dev_upper_range=(1, 3), step_size=args.step_size)
+
+    parameter_grid = build_parameter_grid(**space)
+    start = time.process_time()
+    profits = grid_profits(market_data, parameter_grid)
+    grid_time = time.process_time() - start
+    grid_best = np.nanmax(profits)
+    ranked = np.sort(np.nan_to_num(profits, nan=-np.inf))[::-1]
+
+    def print_row(method, evaluations, cpu_time, best_profit):
+        # Share of the grid that scores at least as well as the search result
+        top = 100 * np.searchsorted(-ranked, -best_profit, side='right') / len(ranked)
+        print(f"{method:>12} {evaluations:>8} {cpu_time:>9.2f} {best_profit:>12.2f} {top:>7.3f} {100 * evaluations / len(parameter_grid):>8.2f}")
+
+    print(f"{'method':>12} {'evals':>8} {'cpu (s)':>9} {'best profit':>12} {'top %':>7} {'evals %':>8}")
+    print_row('grid', len(parameter_grid), grid_time, grid_best)
+
+    start = time.process_time()
+    discrete_grid = list(product(*build_parameter_space(**space)[:5]))
+    refined = refine_std_devs(market_data, discrete_grid, (space['bollinger_std_dev_lower_range'], space['bollinger_std_dev_upper_range']), args.step_size, args.coarse_step)
+    print_row('refine', len(refined), time.process_time() - start, np.nanmax(list(refined.values())))
+
+    for budget in args.budgets:
+        for method, explore in (('tpe', 0.5), ('random', 1.0)):
+            for seed in range(args.seeds):
+                start = time.process_time()
+                _, best_profit = optimize_strategy_tpe(market_data, budget=budget, seed=seed, explore=explore, log_file=None, **space)
+                print_row(f'{method} {budget}/{seed}', budget, time.process_time() - start, best_profit)
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,8 @@
-import os
 import pandas as pd
 import matplotlib.pyplot as plt
 import argparse
-
-def load_data(directory):
-    market_data = {}
-    if not os.path.exists(directory):
-        raise FileNotFoundError(f"The system cannot find the path specified: {directory}")
-
-    for file in os.listdir(directory):
-        if file.endswith('.csv'):
-            path = os.path.join(directory, file)
-            df = pd.read_csv(path, parse_dates=['Date'], index_col='Date', dayfirst=True)
-            df.index = pd.to_datetime(df.index)
-            df = df[~df.index.duplicated(keep='first')]
-            df = df.sort_index()
-            df = df.asfreq('D', method='ffill')
-            market_data[file.replace('.csv', '')] = df
-    return market_data
+from market_data import CALENDARS, load_data
+from backtest_engine import simulate_positions, trade_records
 
 def synchronize_start_dates(market_data, start_date):
     if start_date is None:
@@ -41,35 +26,9 @@ def simulate_trades(market_data, initial_assets=10000, num_long_entry=3, num_lon
         df['LongExit'] = check_consecutive_closes(df, num_long_exit, direction='negative')
         df['ShortEntry'] = check_consecutive_closes(df, num_short_entry, direction='negative')
         df['ShortExit'] = check_consecutive_closes(df, num_short_exit, direction='positive')
-        
-        current_position = None
-        
-        for date, row in df.iterrows():
-            price = row['Close']
-            
-            if current_position:
-                trade_type, entry_price, entry_market = current_position
-                
-                if trade_type == 'Long' and row['LongExit']:
-                    profit = price - entry_price
-                    balance += profit
-                    trades.append((date, entry_market, 'Long Exit', price, profit, balance))
-                    current_position = None
-                    
-                elif trade_type == 'Short' and row['ShortExit']:
-                    profit = entry_price - price
-                    balance += profit
-                    trades.append((date, entry_market, 'Short Exit', price, profit, balance))
-                    current_position = None
-                    
-            if not current_position:
-                if row['LongEntry']:
-                    current_position = ('Long', price, market)
-                    trades.append((date, market, 'Long Entry', price, 0, balance))
-                    
-                elif row['ShortEntry']:
-                    current_position = ('Short', price, market)
-                    trades.append((date, market, 'Short Entry', price, 0, balance))
+
+        events, balance = simulate_positions(df['Close'], df['LongEntry'], df['LongExit'], df['ShortEntry'], df['ShortExit'], balance=balance)
+        trades.extend(trade_records(df.index, market, events))
 
     return trades, balance
 
@@ -148,6 +107,7 @@ def parse_arguments():
     parser.add_argument("--long_exit", "-lx", type=int, default=2, help="Number of consecutive negative closes for long exit")
     parser.add_argument("--short_entry", "-se", type=int, default=3, help="Number of consecutive negative closes for short entry")
     parser.add_argument("--short_exit", "-sx", type=int, default=2, help="Number of consecutive positive closes for short exit")
+    parser.add_argument("--calendar", "-c", choices=CALENDARS, default="daily", help="bar calendar: daily (forward filled), business, trading or union of trading days")
 
     args = parser.parse_args()
 
@@ -160,7 +120,7 @@ def main():
     if args.startday is not None:
         start_date = pd.Timestamp(args.startday)
 
-    market_data = load_data(directory)
+    market_data = load_data(directory, calendar=args.calendar)
     market_data = synchronize_start_dates(market_data, start_date)
     trades, final_balance = simulate_trades(market_data, 
                                             num_long_entry=args.long_entry,
@@ -1,25 +1,22 @@
-import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import argparse
 from itertools import product
-
-def load_data(directory):
-    market_data = {}
-    if not os.path.exists(directory):
-        raise FileNotFoundError(f"The system cannot find the path specified: {directory}")
-
-    for file in os.listdir(directory):
-        if file.endswith('.csv'):
-            path = os.path.join(directory, file)
-            df = pd.read_csv(path, parse_dates=['Date'], index_col='Date', dayfirst=True)
-            df.index = pd.to_datetime(df.index)
-            df = df[~df.index.duplicated(keep='first')]
-            df = df.sort_index()
-            df = df.asfreq('D', method='ffill')
-            market_data[file.replace('.csv', '')] = df
-    return market_data
+from functools import partial
+import time
+from indicators import IndicatorCache, add_streak_columns, consecutive_streaks, rolling_mean_std
+from market_data import CALENDARS, load_data, memory_savings
+from backtest_engine import TRADE_TYPES, leg_masks, simulate_positions, simulate_positions_batch
+from parallel_search import best_parameters, parallel_grid_search
+from price_panel import PricePanel
+from tpe_search import tpe_maximize
+from genetic_search import evolve
+from results_store import DEFAULT_STORE_PATH, ResultsStore, cached_profits, data_fingerprint
+from pruning import CandidatePruned, TradePruner
+from trade_ledger import TradeLedger
+
+STRATEGY_NAME = 'consecutive_closes_bb_opt'
 
 def synchronize_start_dates(market_data, start_date):
     if start_date is None:
@@ -28,66 +25,143 @@ def synchronize_start_dates(market_data, start_date):
         market_data[market] = df[df.index >= start_date]
     return market_data
 
+def truncate_end_dates(market_data, end_date):
+    """ Copy of market_data keeping only bars before end_date, the counterpart of synchronize_start_dates. """
+    return {market: df[df.index < end_date] for market, df in market_data.items()}
+
 def check_consecutive_closes(df, num_consecutive, direction='positive'):
+    # Streak lengths are computed once per market, every later call is a single comparison
+    if 'UpStreak' not in df.columns:
+        add_streak_columns(df)
     if direction == 'positive':
-        return (df['Close'].diff() > 0).rolling(window=num_consecutive).sum().eq(num_consecutive)
+        return df['UpStreak'] >= num_consecutive
     else:
-        return (df['Close'].diff() < 0).rolling(window=num_consecutive).sum().eq(num_consecutive)
+        return df['DownStreak'] >= num_consecutive
 
-def calculate_bollinger_bands(df, window, num_std_dev_lower, num_std_dev_upper):
-    df['MA'] = df['Close'].rolling(window=window).mean()
-    df['BB_Lower'] = df['MA'] - (df['Close'].rolling(window=window).std() * num_std_dev_lower)
-    df['BB_Upper'] = df['MA'] + (df['Close'].rolling(window=window).std() * num_std_dev_upper)
+def calculate_bollinger_bands(df, window, num_std_dev_lower, num_std_dev_upper, indicator_cache=None, market=None):
+    if indicator_cache is None:
+        ma = df['Close'].rolling(window=window).mean()
+        std = df['Close'].rolling(window=window).std()
+    else:
+        ma = indicator_cache.rolling_mean(market, df['Close'], window)
+        std = indicator_cache.rolling_std(market, df['Close'], window)
+    df['MA'] = ma
+    df['BB_Lower'] = ma - (std * num_std_dev_lower)
+    df['BB_Upper'] = ma + (std * num_std_dev_upper)
     return df
 
-def simulate_trades(market_data, initial_assets=10000, num_long_entry=3, num_long_exit=2, num_short_entry=3, num_short_exit=2, bollinger_window=20, bollinger_std_dev_lower=1.5, bollinger_std_dev_upper=1.5):
+def simulate_trades(market_data, initial_assets=10000, num_long_entry=3, num_long_exit=2, num_short_entry=3, num_short_exit=2, bollinger_window=20, bollinger_std_dev_lower=1.5, bollinger_std_dev_upper=1.5, indicator_cache=None, pruner=None):
     balance = initial_assets
-    trades = []
-    current_positions = {}  # Keep track of positions per market
+    trades = TradeLedger()
 
     for market, df in market_data.items():
-        df = calculate_bollinger_bands(df, bollinger_window, bollinger_std_dev_lower, bollinger_std_dev_upper)
+        df = calculate_bollinger_bands(df, bollinger_window, bollinger_std_dev_lower, bollinger_std_dev_upper, indicator_cache, market)
         df['LongEntry'] = check_consecutive_closes(df, num_long_entry, direction='positive') & (df['Close'] > df['BB_Lower'])
         df['LongExit'] = check_consecutive_closes(df, num_long_exit, direction='negative')
         df['ShortEntry'] = check_consecutive_closes(df, num_short_entry, direction='negative') & (df['Close'] < df['BB_Upper'])
         df['ShortExit'] = check_consecutive_closes(df, num_short_exit, direction='positive')
-        
-        current_positions[market] = None
-
-        for date, row in df.iterrows():
-            price = row['Close']
-            position = current_positions[market]
-
-            if position:
-                trade_type, entry_price = position
-                
-                if trade_type == 'Long' and row['LongExit']:
-                    profit = price - entry_price
-                    balance += profit
-                    trades.append((date, market, 'Long Exit', price, profit, balance))
-                    current_positions[market] = None
-                
-                elif trade_type == 'Short' and row['ShortExit']:
-                    profit = entry_price - price
-                    balance += profit
-                    trades.append((date, market, 'Short Exit', price, profit, balance))
-                    current_positions[market] = None
-
-            if not current_positions[market]:
-                if row['LongEntry']:
-                    current_positions[market] = ('Long', price)
-                    trades.append((date, market, 'Long Entry', price, 0, balance))
-                
-                elif row['ShortEntry']:
-                    current_positions[market] = ('Short', price)
-                    trades.append((date, market, 'Short Entry', price, 0, balance))
+
+        on_exit = None if pruner is None else pruner.hook(market)
+        events, balance = simulate_positions(df['Close'], df['LongEntry'], df['LongExit'], df['ShortEntry'], df['ShortExit'], balance=balance, on_exit=on_exit)
+        trades.append_events(df.index, market, events)
 
     return trades, balance
 
+def market_indicators(market_data, windows):
+    """
+    Streaks and rolling mean/std for every Bollinger window, computed once per market over its
+    whole history. They only look back, so any date slice of them is what a simulation of
+    that slice with its preceding warm-up would compute.
+    """
+    windows = np.unique(np.asarray(windows, dtype=np.int64))
+    indicators = {}
+    for market, df in market_data.items():
+        close = df['Close'].to_numpy(dtype=np.float64)
+        up, down = consecutive_streaks(close)
+        # Same kernel the optimizer primes its indicator cache with, so bands match bit for bit
+        means, stds = rolling_mean_std(close, windows)
+        indicators[market] = {'dates': df.index, 'close': close, 'up': up, 'down': down, 'windows': windows, 'means': means, 'stds': stds}
+    return indicators
+
+def indicators_panel(indicators):
+    """ market_indicators as one PricePanel: Close, UpStreak, DownStreak, then a Mean and a Std field per window. """
+    windows = next(iter(indicators.values()))['windows'] if indicators else np.array([], dtype=np.int64)
+    fields = ['Close', 'UpStreak', 'DownStreak'] + [f'Mean{window}' for window in windows] + [f'Std{window}' for window in windows]
+    symbols = list(indicators)
+    dates = pd.DatetimeIndex([])
+    for values in indicators.values():
+        dates = dates.union(values['dates'])
+
+    panel_values = np.full((len(fields), len(dates), len(symbols)), np.nan)
+    valid = np.zeros((len(dates), len(symbols)), dtype=bool)
+    for j, values in enumerate(indicators.values()):
+        rows = dates.get_indexer(values['dates'])
+        valid[rows, j] = True
+        panel_values[0, rows, j] = values['close']
+        panel_values[1, rows, j] = values['up']
+        panel_values[2, rows, j] = values['down']
+        panel_values[3:3 + len(windows), rows, j] = values['means']
+        panel_values[3 + len(windows):, rows, j] = values['stds']
+    return PricePanel(dates, symbols, fields, panel_values, valid)
+
+def panel_indicators(panel):
+    """ The market_indicators dict back from an indicators_panel, viewing the panel's arrays where a market's bars are contiguous. """
+    windows = np.array([int(field[len('Mean'):]) for field in panel.fields if field.startswith('Mean')], dtype=np.int64)
+    means = slice(3, 3 + len(windows))
+    stds = slice(3 + len(windows), 3 + 2 * len(windows))
+    indicators = {}
+    for j, market in enumerate(panel.symbols):
+        rows = panel.symbol_rows(market)
+        indicators[market] = {
+            'dates': panel.dates[rows],
+            'close': panel.values[0, rows, j],
+            'up': panel.values[1, rows, j],
+            'down': panel.values[2, rows, j],
+            'windows': windows,
+            'means': panel.values[means, rows, j],
+            'stds': panel.values[stds, rows, j],
+        }
+    return indicators
+
+def simulate_indicators_batch(indicators, parameter_sets, initial_assets=10000, start_date=None, end_date=None):
+    """ simulate_trades_batch on precomputed market_indicators, trading only bars in [start_date, end_date). """
+    parameter_sets = np.asarray(parameter_sets, dtype=np.float64)
+    le, lx, se, sx, bw, bsdd, bsdu = parameter_sets.T
+    balances = np.full(len(parameter_sets), initial_assets, dtype=np.float64)
+
+    for market, values in indicators.items():
+        dates = values['dates']
+        first = 0 if start_date is None else dates.searchsorted(start_date)
+        last = len(dates) if end_date is None else dates.searchsorted(end_date)
+        if first >= last:
+            continue
+        close = values['close'][first:last]
+        up, down = values['up'][first:last, None], values['down'][first:last, None]
+        window_rows = values['windows'].searchsorted(bw.astype(np.int64))
+        ma = values['means'][window_rows, first:last].T
+        std = values['stds'][window_rows, first:last].T
+        column = close[:, None]
+
+        long_entry = (up >= le) & (column > ma - (std * bsdd))
+        long_exit = down >= lx
+        short_entry = (down >= se) & (column < ma + (std * bsdu))
+        short_exit = up >= sx
+        balances = simulate_positions_batch(close, long_entry, long_exit, short_entry, short_exit, balance=balances)
+
+    return balances
+
+def simulate_trades_batch(market_data, parameter_sets, initial_assets=10000):
+    """
+    simulate_trades for a (sets x 7) matrix of (le, lx, se, sx, bw, bsdd, bsdu) rows at once.
+    Signals are stacked along a parameter axis and all sets advance over the bars together.
+    Returns the vector of final balances, one per row.
+    """
+    windows = [params[4] for params in parameter_sets]
+    return simulate_indicators_batch(market_indicators(market_data, windows), parameter_sets, initial_assets)
+
 def plot_results(market_data, trades):
-    """ Plot trading results and balance over time. """
-    trades_df = pd.DataFrame(trades, columns=['Date', 'Symbol', 'TradeType', 'Price', 'Profit', 'Balance'])
-    trades_df['Date'] = pd.to_datetime(trades_df['Date'])
+    """ Plot trading results and balance over time, trades is a TradeLedger. """
+    trades_df = trades.to_frame()
     trades_df.set_index('Date', inplace=True)
     
     # Group by date and take the last balance value for each date
@@ -101,39 +175,14 @@ def plot_results(market_data, trades):
         ax1.plot(df.index, df['BB_Lower'], linestyle='--', label=f'{market} Bollinger Lower Band')
         ax1.plot(df.index, df['BB_Upper'], linestyle='--', label=f'{market} Bollinger Upper Band')
 
-    labels_added = {'Long Entry': False, 'Long Exit': False, 'Short Entry': False, 'Short Exit': False}
-    for trade in trades:
-        label = None
-        if 'Entry' in trade[2]:
-            if 'Long' in trade[2]:
-                color = 'green'
-                direction = '^'
-                label = 'Long Entry'
-            else:
-                color = 'blue'
-                direction = 'v'
-                label = 'Short Entry'
-            
-            if not labels_added[label]:
-                ax1.scatter(trade[0], trade[3], color=color, marker=direction, label=label)
-                labels_added[label] = True
-            else:
-                ax1.scatter(trade[0], trade[3], color=color, marker=direction)
-        elif 'Exit' in trade[2]:
-            if 'Long' in trade[2]:
-                color = 'red'
-                direction = 'v'
-                label = 'Long Exit'
-            else:
-                color = 'orange'
-                direction = '^'
-                label = 'Short Exit'
-            
-            if not labels_added[label]:
-                ax1.scatter(trade[0], trade[3], color=color, marker=direction, label=label)
-                labels_added[label] = True
-            else:
-                ax1.scatter(trade[0], trade[3], color=color, marker=direction)
+    # One scatter call per trade type instead of one per trade
+    markers = {'Long Entry': ('green', '^'), 'Long Exit': ('red', 'v'), 'Short Entry': ('blue', 'v'), 'Short Exit': ('orange', '^')}
+    trade_types = trades.trade_type_codes()
+    for code, label in enumerate(TRADE_TYPES):
+        mask = trade_types == code
+        if mask.any():
+            color, direction = markers[label]
+            ax1.scatter(trades_df.index[mask], trades_df['Price'].to_numpy()[mask], color=color, marker=direction, label=label)
 
     ax1.set_title('Market Close Prices and Trades')
     ax1.set_xlabel('Date')
@@ -164,16 +213,54 @@ def parse_arguments():
     parser.add_argument("--bollinger_window", "-bw", type=int, default=20, help="Window size for Bollinger Bands")
     parser.add_argument("--bollinger_std_dev_lower", "-bsdd", type=float, default=1.5, help="Standard deviation for Bollinger Lower Band")
     parser.add_argument("--bollinger_std_dev_upper", "-bsdu", type=float, default=1.5, help="Standard deviation for Bollinger Upper Band")
+    parser.add_argument("--calendar", "-c", choices=CALENDARS, default="daily", help="bar calendar: daily (forward filled), business, trading or union of trading days")
+    parser.add_argument("--compact", action="store_true", default=False, help="load only Close prices as float32 to save memory")
+    parser.add_argument("--batch", action="store_true", default=False, help="evaluate the parameter grid in batches along a parameter axis")
+    parser.add_argument("--workers", "-w", type=int, default=None, help="split the parameter grid across this many processes, 0 uses every core")
+    parser.add_argument("--search", choices=("grid", "tpe", "genetic", "halving", "refine", "separable"), default="grid", help="exhaustive grid, TPE model-based search with --budget evaluations, genetic algorithm (--generations, --population, --time_budget), successive halving over growing date windows, coarse-to-fine std dev refinement down to --step_size or the grid from separately simulated long and short legs")
+    parser.add_argument("--budget", type=int, default=200, help="evaluations for --search tpe")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for --search tpe and genetic")
+    parser.add_argument("--generations", type=int, default=50, help="generations of --search genetic")
+    parser.add_argument("--population", type=int, default=64, help="population size of --search genetic")
+    parser.add_argument("--time_budget", type=float, default=None, help="stop --search genetic after this many seconds")
+    parser.add_argument("--initial_days", type=int, default=365, help="first date window of --search halving, doubled every round")
+    parser.add_argument("--keep_fraction", type=float, default=0.5, help="share of candidates --search halving keeps after each round")
+    parser.add_argument("--coarse_step", type=float, default=None, help="first std dev step of --search refine, --step_size times a power of two (default 4 x --step_size)")
+    parser.add_argument("--verify", action="store_true", default=False, help="check --search separable against a full simulation of the grid")
+    parser.add_argument("--step_size", type=float, default=0.5, help="Bollinger std dev step of the parameter space")
+    parser.add_argument("--walk_forward", action="store_true", default=False, help="optimise on rolling train windows and trade the winners on the following test windows")
+    parser.add_argument("--train_days", type=int, default=730, help="train window of --walk_forward")
+    parser.add_argument("--test_days", type=int, default=180, help="test window of --walk_forward, also the step between folds")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="SQLite file of evaluated parameter sets, reruns skip them and interrupted sweeps resume")
+    parser.add_argument("--no_store", action="store_true", default=False, help="evaluate every parameter set without reading or writing the results store")
+    parser.add_argument("--prune", action="store_true", default=False, help="serial grid: abandon parameter sets that can no longer beat the best profit so far (exact)")
+    parser.add_argument("--max_drawdown", type=float, default=None, help="serial grid: abandon parameter sets whose balance falls this far below its peak")
 
     args = parser.parse_args()
+    if args.search == 'refine':
+        try:
+            refinement_levels(args.step_size, args.coarse_step)
+        except ValueError as error:
+            parser.error(str(error))
+    if args.search == 'halving':
+        if args.initial_days <= 0:
+            parser.error(f"--initial_days must be positive, got {args.initial_days}")
+        if not 0 < args.keep_fraction <= 1:
+            parser.error(f"--keep_fraction must be in (0, 1], got {args.keep_fraction:g}")
+    if args.walk_forward and (args.train_days <= 0 or args.test_days <= 0):
+        parser.error(f"--train_days and --test_days must be positive, got {args.train_days} and {args.test_days}")
+    if args.prune or args.max_drawdown is not None:
+        # Only the serial grid simulates parameter sets one at a time, where a set can be abandoned
+        other_path = ('--walk_forward' if args.walk_forward else f'--search {args.search}' if args.search != 'grid'
+                      else '--workers' if args.workers is not None else '--batch' if args.batch else None)
+        if other_path is not None:
+            parser.error(f"--prune and --max_drawdown only apply to the serial grid search, not with {other_path}")
 
     return args
 
-def optimize_strategy(market_data, initial_assets=10000, long_entry_range=(2, 6), long_exit_range=(1, 3), short_entry_range=(2, 6), short_exit_range=(1, 3), bollinger_window_range=(15, 25), bollinger_window_step=1, bollinger_std_dev_lower_range=(1, 3), bollinger_std_dev_upper_range=(1, 3), step_size=0.1):
-    best_profit = -np.inf
-    best_params = None
-
-    parameter_grid = product(
+def build_parameter_space(long_entry_range=(2, 6), long_exit_range=(1, 3), short_entry_range=(2, 6), short_exit_range=(1, 3), bollinger_window_range=(15, 25), bollinger_window_step=1, bollinger_std_dev_lower_range=(1, 3), bollinger_std_dev_upper_range=(1, 3), step_size=0.1):
+    """ The values each of (le, lx, se, sx, bw, bsdd, bsdu) takes, the grid is their product. """
+    return [
         range(*long_entry_range),
         range(*long_exit_range),
         range(*short_entry_range),
@@ -181,47 +268,437 @@ def optimize_strategy(market_data, initial_assets=10000, long_entry_range=(2, 6)
         range(bollinger_window_range[0], bollinger_window_range[1] + bollinger_window_step, bollinger_window_step),
         np.arange(bollinger_std_dev_lower_range[0], bollinger_std_dev_lower_range[1] + step_size, step_size),
         np.arange(bollinger_std_dev_upper_range[0], bollinger_std_dev_upper_range[1] + step_size, step_size)
-    )
+    ]
 
-    log_file = "optimization_log.txt"
+def build_parameter_grid(*args, **kwargs):
+    return list(product(*build_parameter_space(*args, **kwargs)))
+
+def write_optimization_log(parameter_grid, profits, log_file="optimization_log.txt"):
     with open(log_file, 'w') as f:
         f.write("le, lx, se, sx, bw, bsdd, bsdu, total_profit\n")
+        f.writelines(f"{le}, {lx}, {se}, {sx}, {bw}, {bsdd:.2f}, {bsdu:.2f}, {total_profit:.2f}\n" for (le, lx, se, sx, bw, bsdd, bsdu), total_profit in zip(parameter_grid, profits))
 
-    for params in parameter_grid:
-        le, lx, se, sx, bw, bsdd, bsdu = params
-        _, total_profit = simulate_trades(
-            market_data,
-            initial_assets=initial_assets,
-            num_long_entry=le,
-            num_long_exit=lx,
-            num_short_entry=se,
-            num_short_exit=sx,
-            bollinger_window=bw,
-            bollinger_std_dev_lower=bsdd,
-            bollinger_std_dev_upper=bsdu
-        )
+def store_fingerprint(market_data, initial_assets, results_store):
+    return None if results_store is None else data_fingerprint(market_data, initial_assets)
+
+def optimize_strategy(market_data, initial_assets=10000, long_entry_range=(2, 6), long_exit_range=(1, 3), short_entry_range=(2, 6), short_exit_range=(1, 3), bollinger_window_range=(15, 25), bollinger_window_step=1, bollinger_std_dev_lower_range=(1, 3), bollinger_std_dev_upper_range=(1, 3), step_size=0.1, results_store=None, prune=False, max_drawdown=None):
+    """ Serial grid search. prune and max_drawdown enable a TradePruner, pruned parameter sets are logged as nan and not stored. """
+    parameter_grid = build_parameter_grid(long_entry_range, long_exit_range, short_entry_range, short_exit_range, bollinger_window_range, bollinger_window_step, bollinger_std_dev_lower_range, bollinger_std_dev_upper_range, step_size)
 
-        with open(log_file, 'a') as f:
-            f.write(f"{le}, {lx}, {se}, {sx}, {bw}, {bsdd:.2f}, {bsdu:.2f}, {total_profit:.2f}\n")
+    # Rolling mean/std depend only on the window, share them across all the other parameters
+    bollinger_windows = sorted({params[4] for params in parameter_grid})
+    indicator_cache = IndicatorCache(max_entries=max(512, 2 * len(market_data) * len(bollinger_windows)))
+    for market, df in market_data.items():
+        indicator_cache.prime_rolling_stats(market, df['Close'], bollinger_windows)
+
+    pruner = TradePruner(market_data, max_drawdown, use_bound=prune) if prune or max_drawdown is not None else None
+
+    def evaluate(pending, on_chunk):
+        for params in pending:
+            le, lx, se, sx, bw, bsdd, bsdu = params
+            if pruner is not None:
+                pruner.begin(initial_assets)
+            try:
+                _, total_profit = simulate_trades(
+                    market_data,
+                    initial_assets=initial_assets,
+                    num_long_entry=le,
+                    num_long_exit=lx,
+                    num_short_entry=se,
+                    num_short_exit=sx,
+                    bollinger_window=bw,
+                    bollinger_std_dev_lower=bsdd,
+                    bollinger_std_dev_upper=bsdu,
+                    indicator_cache=indicator_cache,
+                    pruner=pruner
+                )
+            except CandidatePruned as pruned:
+                pruner.prune(pruned)
+                print(f"[-] Long Entry={le}, Long Exit={lx}, Short Entry={se}, Short Exit={sx}, Bollinger Window={bw}, Bollinger Std Dev Lower={bsdd:.2f}, Bollinger Std Dev Upper={bsdu:.2f}, pruned ({pruned.reason})")
+                continue
+            if pruner is not None:
+                pruner.complete(total_profit)
             print(f"[-] Long Entry={le}, Long Exit={lx}, Short Entry={se}, Short Exit={sx}, Bollinger Window={bw}, Bollinger Std Dev Lower={bsdd:.2f}, Bollinger Std Dev Upper={bsdu:.2f}, total_profit={total_profit:.2f}")
+            on_chunk([params], [total_profit])
+
+    fingerprint = store_fingerprint(market_data, initial_assets, results_store)
+    profits = cached_profits(results_store, fingerprint, STRATEGY_NAME, parameter_grid, evaluate)
+    write_optimization_log(parameter_grid, profits)
+
+    stats = indicator_cache.stats()
+    print(f"Indicator cache: {stats['misses']} computed, {stats['hits']} reused, {stats['evictions']} evicted")
+    if pruner is not None:
+        print(pruner.summary())
+
+    return best_parameters(parameter_grid, profits)
+
+def optimize_strategy_batch(market_data, initial_assets=10000, long_entry_range=(2, 6), long_exit_range=(1, 3), short_entry_range=(2, 6), short_exit_range=(1, 3), bollinger_window_range=(15, 25), bollinger_window_step=1, bollinger_std_dev_lower_range=(1, 3), bollinger_std_dev_upper_range=(1, 3), step_size=0.1, batch_size=512, results_store=None):
+    """ optimize_strategy over the same grid, evaluated batch_size parameter sets per simulate_trades_batch call. """
+    parameter_grid = build_parameter_grid(long_entry_range, long_exit_range, short_entry_range, short_exit_range, bollinger_window_range, bollinger_window_step, bollinger_std_dev_lower_range, bollinger_std_dev_upper_range, step_size)
+
+    def evaluate(pending, on_chunk):
+        start = time.perf_counter()
+        for i in range(0, len(pending), batch_size):
+            chunk = pending[i:i + batch_size]
+            on_chunk(chunk, simulate_trades_batch(market_data, chunk, initial_assets))
+        elapsed = time.perf_counter() - start
+        print(f"Evaluated {len(pending)} parameter sets in {elapsed:.2f}s ({len(pending) / elapsed:,.0f} sets/s)")
+
+    fingerprint = store_fingerprint(market_data, initial_assets, results_store)
+    profits = cached_profits(results_store, fingerprint, STRATEGY_NAME, parameter_grid, evaluate)
+    write_optimization_log(parameter_grid, profits)
+    return best_parameters(parameter_grid, profits)
+
+def evaluate_parameter_chunk(market_data, chunk, initial_assets=10000):
+    """ simulate_trades for each parameter set of a chunk, sharing rolling stats through one indicator cache. """
+    windows = sorted({params[4] for params in chunk})
+    indicator_cache = IndicatorCache(max_entries=max(512, 2 * len(market_data) * len(windows)))
+    for market, df in market_data.items():
+        indicator_cache.prime_rolling_stats(market, df['Close'], windows)
+    return [simulate_trades(market_data, initial_assets, *params, indicator_cache=indicator_cache)[1] for params in chunk]
+
+def optimize_strategy_parallel(market_data, initial_assets=10000, long_entry_range=(2, 6), long_exit_range=(1, 3), short_entry_range=(2, 6), short_exit_range=(1, 3), bollinger_window_range=(15, 25), bollinger_window_step=1, bollinger_std_dev_lower_range=(1, 3), bollinger_std_dev_upper_range=(1, 3), step_size=0.1, workers=0, batch=False, results_store=None):
+    """
+    optimize_strategy with the grid split into chunks across worker processes, same log and
+    best parameters for any worker count. batch evaluates each chunk with simulate_trades_batch.
+    """
+    parameter_grid = build_parameter_grid(long_entry_range, long_exit_range, short_entry_range, short_exit_range, bollinger_window_range, bollinger_window_step, bollinger_std_dev_lower_range, bollinger_std_dev_upper_range, step_size)
+    evaluate_chunk = partial(simulate_trades_batch if batch else evaluate_parameter_chunk, initial_assets=initial_assets)
+
+    def evaluate(pending, on_chunk):
+        _, rate = parallel_grid_search(evaluate_chunk, market_data, pending, workers=workers, on_chunk=on_chunk)
+        print(f"Evaluated {len(pending)} parameter sets with {workers or 'all'} workers: {rate:,.1f} evaluations/s")
+
+    fingerprint = store_fingerprint(market_data, initial_assets, results_store)
+    profits = cached_profits(results_store, fingerprint, STRATEGY_NAME, parameter_grid, evaluate)
+    write_optimization_log(parameter_grid, profits)
+    return best_parameters(parameter_grid, profits)
+
+def optimize_strategy_tpe(market_data, initial_assets=10000, long_entry_range=(2, 6), long_exit_range=(1, 3), short_entry_range=(2, 6), short_exit_range=(1, 3), bollinger_window_range=(15, 25), bollinger_window_step=1, bollinger_std_dev_lower_range=(1, 3), bollinger_std_dev_upper_range=(1, 3), step_size=0.1, budget=200, seed=0, explore=0.5, log_file="optimization_log.txt"):
+    """
+    Model-based (TPE) search over the same parameter space as optimize_strategy, evaluating at
+    most budget points with simulate_trades_batch instead of the whole product. explore=1.0
+    turns it into plain random search.
+    """
+    space = build_parameter_space(long_entry_range, long_exit_range, short_entry_range, short_exit_range, bollinger_window_range, bollinger_window_step, bollinger_std_dev_lower_range, bollinger_std_dev_upper_range, step_size)
+    grid_size = int(np.prod([len(values) for values in space], dtype=np.float64))
+
+    start = time.perf_counter()
+    best_params, best_profit, history = tpe_maximize(space, lambda chunk: simulate_trades_batch(market_data, chunk, initial_assets), budget=budget, explore=explore, seed=seed)
+    elapsed = time.perf_counter() - start
+    print(f"TPE evaluated {len(history)} of {grid_size} grid points ({100 * len(history) / grid_size:.1f}%) in {elapsed:.2f}s")
+
+    if log_file is not None:
+        write_optimization_log([params for params, _ in history], [total_profit for _, total_profit in history], log_file)
+    return best_params, best_profit
+
+def optimize_strategy_genetic(market_data, initial_assets=10000, long_entry_range=(2, 6), long_exit_range=(1, 3), short_entry_range=(2, 6), short_exit_range=(1, 3), bollinger_window_range=(15, 25), bollinger_window_step=1, bollinger_std_dev_lower_range=(1, 3), bollinger_std_dev_upper_range=(1, 3), step_size=0.1, population_size=64, generations=50, elite=4, seed=0, time_budget=None):
+    """ Genetic search of the optimize_strategy space, each generation simulated in one simulate_trades_batch call. """
+    space = build_parameter_space(long_entry_range, long_exit_range, short_entry_range, short_exit_range, bollinger_window_range, bollinger_window_step, bollinger_std_dev_lower_range, bollinger_std_dev_upper_range, step_size)
 
-        if total_profit > best_profit:
-            best_profit = total_profit
-            best_params = params
+    def report(generation, best_params, best_fitness, evaluations, rate):
+        print(f"[-] Generation {generation}: best profit {best_fitness:.2f} {best_params[:5]} bsdd={best_params[5]:.2f} bsdu={best_params[6]:.2f}, {evaluations} evaluations, {rate:,.0f} evaluations/s")
 
+    best_params, best_profit, _ = evolve(space, lambda population: simulate_trades_batch(market_data, population, initial_assets), population_size=population_size, generations=generations, elite=elite, seed=seed, time_budget=time_budget, on_generation=report)
     return best_params, best_profit
 
+def optimize_strategy_halving(market_data, initial_assets=10000, long_entry_range=(2, 6), long_exit_range=(1, 3), short_entry_range=(2, 6), short_exit_range=(1, 3), bollinger_window_range=(15, 25), bollinger_window_step=1, bollinger_std_dev_lower_range=(1, 3), bollinger_std_dev_upper_range=(1, 3), step_size=0.1, initial_days=365, keep_fraction=0.5, batch_size=512):
+    """
+    Successive halving over growing date windows: every candidate is simulated on the first
+    initial_days of history, the best keep_fraction survive, the window doubles, and so on
+    until the survivors are ranked on the full history.
+    """
+    if initial_days <= 0:
+        raise ValueError(f"initial days {initial_days} must be positive")
+    if not 0 < keep_fraction <= 1:
+        raise ValueError(f"keep fraction {keep_fraction:g} must be in (0, 1]")
+    parameter_grid = build_parameter_grid(long_entry_range, long_exit_range, short_entry_range, short_exit_range, bollinger_window_range, bollinger_window_step, bollinger_std_dev_lower_range, bollinger_std_dev_upper_range, step_size)
+    first_date = min(df.index[0] for df in market_data.values() if len(df))
+    last_date = max(df.index[-1] for df in market_data.values() if len(df))
+    full_bars = sum(len(df) for df in market_data.values())
+
+    candidates = parameter_grid
+    days = initial_days
+    bar_evaluations = 0
+    while True:
+        end_date = first_date + pd.Timedelta(days=days)
+        final = end_date > last_date
+        rung_data = market_data if final else truncate_end_dates(market_data, end_date)
+        rung_bars = sum(len(df) for df in rung_data.values())
+
+        profits = np.empty(len(candidates))
+        for i in range(0, len(candidates), batch_size):
+            profits[i:i + batch_size] = simulate_trades_batch(rung_data, candidates[i:i + batch_size], initial_assets)
+        bar_evaluations += len(candidates) * rung_bars
+        print(f"[-] {len(candidates)} candidates on {'the full history' if final else f'{days} days'} ({rung_bars} bars)")
+        if final:
+            break
+
+        # Stable ranking keeps grid order among equal profits, NaN profits rank last
+        ranked = np.argsort(-np.nan_to_num(profits, nan=-np.inf), kind='stable')
+        survivors = np.sort(ranked[:max(1, int(np.ceil(len(candidates) * keep_fraction)))])
+        candidates = [candidates[i] for i in survivors]
+        days *= 2
+
+    full_evaluations = len(parameter_grid) * full_bars
+    print(f"Bar evaluations: {bar_evaluations:,} instead of {full_evaluations:,} for the full grid ({100 * (1 - bar_evaluations / full_evaluations):.1f}% saved)")
+
+    write_optimization_log(candidates, profits)
+    return best_parameters(candidates, profits)
+
+def std_dev_axis(std_dev_range, step):
+    # Rounded so the same band width reached at different levels is one cache entry
+    return [round(value, 10) for value in np.arange(std_dev_range[0], std_dev_range[1] + step / 2, step)]
+
+def refinement_levels(step_size, coarse_step=None):
+    """
+    How many times coarse_step halves down to step_size. Only step_size * 2**k with k >= 1 keeps
+    every refined point on the step_size grid; None means 4 x step_size.
+    """
+    if coarse_step is None:
+        return 2
+    ratio = coarse_step / step_size
+    levels = int(round(np.log2(ratio))) if ratio > 0 else 0
+    if levels < 1 or abs(ratio - 2 ** levels) > 1e-9 * ratio:
+        raise ValueError(f"coarse step {coarse_step:g} must be step size {step_size:g} times a power of two, e.g. {step_size * 2:g} or {step_size * 4:g}")
+    return levels
+
+def refine_std_devs(market_data, discrete_grid, std_dev_ranges, step_size=0.1, coarse_step=None, top_k=8, initial_assets=10000, batch_size=512):
+    """
+    Coarse-to-fine search of the continuous band widths: every (le, lx, se, sx, bw) of
+    discrete_grid is simulated with bsdd/bsdu on a coarse_step grid, then the std dev step is
+    halved around the top_k points until it reaches step_size. Each point is simulated once;
+    returns {params: total_profit} in evaluation order.
+    """
+    levels = refinement_levels(step_size, coarse_step)
+    evaluated = {}
+
+    def evaluate(points):
+        pending = [params for params in dict.fromkeys(points) if params not in evaluated]
+        for i in range(0, len(pending), batch_size):
+            chunk = pending[i:i + batch_size]
+            evaluated.update(zip(chunk, simulate_trades_batch(market_data, chunk, initial_assets)))
+        return len(pending)
+
+    # Exact powers of two of step_size, so halving lands on the step_size grid
+    step = step_size * 2 ** levels
+    coarse_std_devs = list(product(std_dev_axis(std_dev_ranges[0], step), std_dev_axis(std_dev_ranges[1], step)))
+    new_points = evaluate([params + std_devs for params in discrete_grid for std_devs in coarse_std_devs])
+    print(f"[-] std dev step {step:g}: {new_points} evaluations")
+    for level in range(levels - 1, -1, -1):
+        step = step_size * 2 ** level
+        # Stable sort keeps evaluation order among equal profits, NaN profits rank last
+        top = sorted(evaluated, key=lambda params: -np.nan_to_num(evaluated[params], nan=-np.inf))[:top_k]
+        neighbours = []
+        for params in top:
+            for offset_lower, offset_upper in product((-step, 0, step), repeat=2):
+                bsdd, bsdu = round(params[5] + offset_lower, 10), round(params[6] + offset_upper, 10)
+                if std_dev_ranges[0][0] <= bsdd <= std_dev_ranges[0][1] and std_dev_ranges[1][0] <= bsdu <= std_dev_ranges[1][1]:
+                    neighbours.append(params[:5] + (bsdd, bsdu))
+        new_points = evaluate(neighbours)
+        print(f"[-] std dev step {step:g}: {new_points} evaluations around the top {len(top)}")
+    return evaluated
+
+def optimize_strategy_refine(market_data, initial_assets=10000, long_entry_range=(2, 6), long_exit_range=(1, 3), short_entry_range=(2, 6), short_exit_range=(1, 3), bollinger_window_range=(15, 25), bollinger_window_step=1, bollinger_std_dev_lower_range=(1, 3), bollinger_std_dev_upper_range=(1, 3), step_size=0.1, coarse_step=None, top_k=8):
+    """ refine_std_devs over the optimize_strategy ranges, reporting its evaluations against the full grid at step_size. """
+    discrete_grid = list(product(*build_parameter_space(long_entry_range, long_exit_range, short_entry_range, short_exit_range, bollinger_window_range, bollinger_window_step)[:5]))
+    std_dev_ranges = (bollinger_std_dev_lower_range, bollinger_std_dev_upper_range)
+    evaluated = refine_std_devs(market_data, discrete_grid, std_dev_ranges, step_size, coarse_step, top_k, initial_assets)
+
+    fine_grid_size = len(discrete_grid) * len(std_dev_axis(std_dev_ranges[0], step_size)) * len(std_dev_axis(std_dev_ranges[1], step_size))
+    print(f"Refinement evaluated {len(evaluated)} parameter sets, a full grid at step {step_size:g} has {fine_grid_size} ({100 * len(evaluated) / fine_grid_size:.1f}%)")
+
+    parameter_sets = list(evaluated)
+    profits = list(evaluated.values())
+    write_optimization_log(parameter_sets, profits)
+    return best_parameters(parameter_sets, profits)
+
+def simulate_legs(close, up, down, mean, std, streak_thresholds, exit_thresholds, std_devs, side):
+    """
+    Simulate one leg ('long' or 'short') of one market alone for every (entry streak, exit
+    streak, std dev), given its streaks and Bollinger mean/std. Returns the profits, shape
+    (entries, exits, std devs), and the leg_masks of every combination, shape (entries, exits,
+    std devs, bars).
+    """
+    shape = (len(streak_thresholds), len(exit_thresholds), len(std_devs))
+    profits = np.zeros(shape)
+    no_signal = np.zeros(len(close), dtype=bool)
+    entries = np.empty(shape + (len(close),), dtype=bool)
+    held = np.empty(shape + (len(close),), dtype=bool)
+    for (i, streak), (j, exit_streak), (k, std_dev) in product(enumerate(streak_thresholds), enumerate(exit_thresholds), enumerate(std_devs)):
+        if side == 'long':
+            signals = ((up >= streak) & (close > mean - (std * std_dev)), down >= exit_streak)
+        else:
+            signals = (no_signal, no_signal, (down >= streak) & (close < mean + (std * std_dev)), up >= exit_streak)
+        events, profits[i, j, k] = simulate_positions(close, *signals)
+        entries[i, j, k], held[i, j, k] = leg_masks(events, len(close))
+    return profits, entries, held
+
+def leg_conflicts(long_entries, long_held, short_entries, short_held):
+    """ (long combinations x short combinations) bool, True where one leg enters on a bar the other holds. """
+    bars = long_held.shape[-1]
+    long_entries, long_held = long_entries.reshape(-1, bars).astype(np.float32), long_held.reshape(-1, bars).astype(np.float32)
+    short_entries, short_held = short_entries.reshape(-1, bars).astype(np.float32), short_held.reshape(-1, bars).astype(np.float32)
+    # Count the shared bars for every pair of legs at once
+    return (long_entries @ short_held.T + long_held @ short_entries.T) > 0
+
+def optimize_strategy_separable(market_data, initial_assets=10000, long_entry_range=(2, 6), long_exit_range=(1, 3), short_entry_range=(2, 6), short_exit_range=(1, 3), bollinger_window_range=(15, 25), bollinger_window_step=1, bollinger_std_dev_lower_range=(1, 3), bollinger_std_dev_upper_range=(1, 3), step_size=0.1, verify=False, batch_size=512):
+    """
+    Long trades depend only on (le, lx, bw, bsdd) and short trades only on (se, sx, bw, bsdu)
+    as long as the two legs never overlap. Each leg is simulated once per its own parameters and
+    every grid point is the sum of its legs; points whose legs overlap (legs_compatible fails)
+    are simulated in full. Profits equal optimize_strategy's up to floating-point summation
+    order, verify re-simulates the whole grid to check that.
+    """
+    long_entries, long_exits, short_entries, short_exits, windows, lowers, uppers = [list(values) for values in build_parameter_space(long_entry_range, long_exit_range, short_entry_range, short_exit_range, bollinger_window_range, bollinger_window_step, bollinger_std_dev_lower_range, bollinger_std_dev_upper_range, step_size)]
+    # Grid axes: le, lx, se, sx, bw, bsdd, bsdu
+    profits = np.empty((len(long_entries), len(long_exits), len(short_entries), len(short_exits), len(windows), len(lowers), len(uppers)))
+    overlapping = np.zeros(profits.shape, dtype=bool)
+
+    for w, window in enumerate(windows):
+        long_profits = np.zeros((len(long_entries), len(long_exits), len(lowers)))
+        short_profits = np.zeros((len(short_entries), len(short_exits), len(uppers)))
+        conflicts = np.zeros((long_profits.size, short_profits.size), dtype=bool)
+        # One market's leg masks at a time, memory stays O(combinations x bars of one market)
+        for market, df in market_data.items():
+            close = df['Close'].to_numpy(dtype=np.float64)
+            up, down = consecutive_streaks(close)
+            means, stds = rolling_mean_std(close, [window])
+            market_long_profits, long_entry_bars, long_held = simulate_legs(close, up, down, means[0], stds[0], long_entries, long_exits, lowers, 'long')
+            market_short_profits, short_entry_bars, short_held = simulate_legs(close, up, down, means[0], stds[0], short_entries, short_exits, uppers, 'short')
+            long_profits += market_long_profits
+            short_profits += market_short_profits
+            conflicts |= leg_conflicts(long_entry_bars, long_held, short_entry_bars, short_held)
+        profits[:, :, :, :, w] = initial_assets + long_profits[:, :, None, None, :, None] + short_profits[None, None, :, :, None, :]
+
+        conflicts = conflicts.reshape(len(long_entries), len(long_exits), len(lowers), len(short_entries), len(short_exits), len(uppers))
+        overlapping[:, :, :, :, w] = conflicts.transpose(0, 1, 3, 4, 2, 5)
+
+    parameter_grid = list(product(long_entries, long_exits, short_entries, short_exits, windows, lowers, uppers))
+    profits = profits.ravel()
+    fallback = np.flatnonzero(overlapping.ravel())
+    for i in range(0, len(fallback), batch_size):
+        chunk = fallback[i:i + batch_size]
+        profits[chunk] = simulate_trades_batch(market_data, [parameter_grid[j] for j in chunk], initial_assets)
+
+    leg_runs = len(windows) * (len(long_entries) * len(long_exits) * len(lowers) + len(short_entries) * len(short_exits) * len(uppers))
+    print(f"Separable search: {leg_runs} leg simulations and {len(fallback)} full simulations for overlapping legs instead of {len(parameter_grid)} full simulations")
+
+    if verify:
+        full = np.concatenate([simulate_trades_batch(market_data, parameter_grid[i:i + batch_size], initial_assets) for i in range(0, len(parameter_grid), batch_size)])
+        difference = np.nanmax(np.abs(full - profits)) if len(full) else 0.0
+        if not np.array_equal(np.isnan(full), np.isnan(profits)) or difference > 1e-6:
+            raise AssertionError(f"separable profits differ from the full simulation by {difference}")
+        print(f"Verified against the full simulation: largest difference {difference:.2e}")
+
+    write_optimization_log(parameter_grid, profits)
+    return best_parameters(parameter_grid, profits)
+
+def walk_forward_folds(market_data, train_days=730, test_days=180):
+    """ Rolling (train start, train end, test end) dates, each test window following its train window and folds stepping by test_days. """
+    if train_days <= 0 or test_days <= 0:
+        raise ValueError(f"train days {train_days} and test days {test_days} must be positive")
+    first_date = min(df.index[0] for df in market_data.values() if len(df))
+    last_date = max(df.index[-1] for df in market_data.values() if len(df))
+    folds = []
+    train_start = first_date
+    while train_start + pd.Timedelta(days=train_days) <= last_date:
+        train_end = train_start + pd.Timedelta(days=train_days)
+        folds.append((train_start, train_end, min(train_end + pd.Timedelta(days=test_days), last_date + pd.Timedelta(days=1))))
+        train_start += pd.Timedelta(days=test_days)
+    return folds
+
+def evaluate_folds(indicators, folds, parameter_grid=(), initial_assets=10000, batch_size=512):
+    """ Optimise every fold on its train window and simulate the winner on its test window, returning (params, train balance, test balance) per fold. """
+    results = []
+    for train_start, train_end, test_end in folds:
+        profits = np.concatenate([simulate_indicators_batch(indicators, parameter_grid[i:i + batch_size], initial_assets, train_start, train_end) for i in range(0, len(parameter_grid), batch_size)])
+        best_params, train_balance = best_parameters(parameter_grid, profits)
+        if best_params is None:
+            results.append((None, train_balance, np.nan))
+            continue
+        test_balance = simulate_indicators_batch(indicators, [best_params], initial_assets, train_end, test_end)[0]
+        results.append((best_params, train_balance, test_balance))
+    return results
+
+def walk_forward(market_data, initial_assets=10000, long_entry_range=(2, 6), long_exit_range=(1, 3), short_entry_range=(2, 6), short_exit_range=(1, 3), bollinger_window_range=(15, 25), bollinger_window_step=1, bollinger_std_dev_lower_range=(1, 3), bollinger_std_dev_upper_range=(1, 3), step_size=0.1, train_days=730, test_days=180, workers=0):
+    """
+    Walk-forward optimisation: the grid is optimised on each rolling train window and its best
+    parameters are traded on the following test window. Indicators are computed once over the
+    whole history and published in shared memory, folds run in worker processes that map them.
+    """
+    parameter_grid = build_parameter_grid(long_entry_range, long_exit_range, short_entry_range, short_exit_range, bollinger_window_range, bollinger_window_step, bollinger_std_dev_lower_range, bollinger_std_dev_upper_range, step_size)
+    folds = walk_forward_folds(market_data, train_days, test_days)
+    indicators = market_indicators(market_data, [params[4] for params in parameter_grid])
+
+    evaluate = partial(evaluate_folds, parameter_grid=parameter_grid, initial_assets=initial_assets)
+    # Workers map the indicators from one shared block and receive only the fold dates
+    results, rate = parallel_grid_search(evaluate, indicators, folds, workers=workers, chunk_size=1, to_panel=indicators_panel, from_panel=panel_indicators)
+    print(f"Walk-forward: {len(folds)} folds of {len(parameter_grid)} parameter sets with {workers or 'all'} workers, {rate:.2f} folds/s")
+
+    out_of_sample = 0.0
+    for (train_start, train_end, test_end), (params, train_balance, test_balance) in zip(folds, results):
+        if params is None:
+            print(f"[-] Train {train_start.date()} to {train_end.date()}: no valid parameters")
+            continue
+        le, lx, se, sx, bw, bsdd, bsdu = params
+        out_of_sample += test_balance - initial_assets
+        print(f"[-] Train {train_start.date()} to {train_end.date()}, test to {test_end.date()}: le={le}, lx={lx}, se={se}, sx={sx}, bw={bw}, bsdd={bsdd:.2f}, bsdu={bsdu:.2f}, in-sample profit={train_balance - initial_assets:.2f}, out-of-sample profit={test_balance - initial_assets:.2f}")
+    print(f"Out-of-sample profit over all test windows: {out_of_sample:.2f}")
+    return folds, results
+
 def main():
     args = parse_arguments()
 
     # Load market data
-    market_data = load_data("MarketData")
+    if args.compact:
+        market_data = load_data("MarketData", calendar=args.calendar, columns=['Close'], compact=True)
+        used, full, saved = memory_savings(market_data)
+        print(f"Compact market data: {used / 1e6:.1f} MB instead of {full / 1e6:.1f} MB ({saved / 1e6:.1f} MB saved)")
+    else:
+        market_data = load_data("MarketData", calendar=args.calendar)
 
     # Synchronize start dates
     market_data = synchronize_start_dates(market_data, args.startday)
 
-    # Optimize strategy
-    best_params, best_profit = optimize_strategy(
+    if args.walk_forward:
+        walk_forward(
+            market_data,
+            initial_assets=10000,
+            long_entry_range=(2, 6),
+            long_exit_range=(1, 3),
+            short_entry_range=(2, 6),
+            short_exit_range=(1, 3),
+            bollinger_window_range=(15, 25),
+            bollinger_window_step=1,
+            bollinger_std_dev_lower_range=(1, 1.5),
+            bollinger_std_dev_upper_range=(1, 1.5),
+            step_size=args.step_size,
+            train_days=args.train_days,
+            test_days=args.test_days,
+            workers=0 if args.workers is None else args.workers
+        )
+        return
+
+    # Optimize strategy, grid searches skip parameter sets already in the results store
+    results_store = None if args.no_store or args.search != 'grid' else ResultsStore(args.store)
+    if args.search == 'tpe':
+        optimize = partial(optimize_strategy_tpe, budget=args.budget, seed=args.seed)
+    elif args.search == 'genetic':
+        optimize = partial(optimize_strategy_genetic, population_size=args.population, generations=args.generations, seed=args.seed, time_budget=args.time_budget)
+    elif args.search == 'halving':
+        optimize = partial(optimize_strategy_halving, initial_days=args.initial_days, keep_fraction=args.keep_fraction)
+    elif args.search == 'refine':
+        optimize = partial(optimize_strategy_refine, coarse_step=args.coarse_step)
+    elif args.search == 'separable':
+        optimize = partial(optimize_strategy_separable, verify=args.verify)
+    elif args.workers is not None:
+        optimize = partial(optimize_strategy_parallel, workers=args.workers, batch=args.batch, results_store=results_store)
+    elif args.batch:
+        optimize = partial(optimize_strategy_batch, results_store=results_store)
+    else:
+        optimize = partial(optimize_strategy, results_store=results_store, prune=args.prune, max_drawdown=args.max_drawdown)
+    best_params, best_profit = optimize(
         market_data,
         initial_assets=10000,
         long_entry_range=(2, 6),
@@ -232,8 +709,11 @@ def main():
         bollinger_window_step=1,
         bollinger_std_dev_lower_range=(1, 1.5),
         bollinger_std_dev_upper_range=(1, 1.5),
-        step_size=0.5
+        step_size=args.step_size
     )
+    # Pending results were flushed as the sweep went, even if it was interrupted
+    if results_store is not None:
+        results_store.close()
 
     le, lx, se, sx, bw, bsdd, bsdu = best_params
 
@@ -254,10 +734,10 @@ def main():
     )
 
     # Plot the results
-    trades_df = plot_results(market_data, trades)
+    plot_results(market_data, trades)
 
     # Save trades to CSV
-    trades_df.to_csv("trades.csv")
+    trades.to_csv("trades.csv")
 
 if __name__ == "__main__":
     main()
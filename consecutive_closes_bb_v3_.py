@@ -1,24 +1,9 @@
-import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import argparse
-
-def load_data(directory):
-    market_data = {}
-    if not os.path.exists(directory):
-        raise FileNotFoundError(f"The system cannot find the path specified: {directory}")
-
-    for file in os.listdir(directory):
-        if file.endswith('.csv'):
-            path = os.path.join(directory, file)
-            df = pd.read_csv(path, parse_dates=['Date'], index_col='Date', dayfirst=True)
-            df.index = pd.to_datetime(df.index)
-            df = df[~df.index.duplicated(keep='first')]
-            df = df.sort_index()
-            df = df.asfreq('D', method='ffill')
-            market_data[file.replace('.csv', '')] = df
-    return market_data
+from market_data import CALENDARS, load_data
+from backtest_engine import simulate_positions, trade_records
 
 def synchronize_start_dates(market_data, start_date):
     if start_date is None:
@@ -42,7 +27,6 @@ def calculate_bollinger_bands(df, window, num_std_dev_lower, num_std_dev_upper):
 def simulate_trades(market_data, initial_assets=10000, num_long_entry=3, num_long_exit=2, num_short_entry=3, num_short_exit=2, bollinger_window=20, bollinger_std_dev_lower=1.5, bollinger_std_dev_upper=1.5):
     balance = initial_assets
     trades = []
-    current_positions = {}  # Keep track of positions per market
 
     for market, df in market_data.items():
         df = calculate_bollinger_bands(df, bollinger_window, bollinger_std_dev_lower, bollinger_std_dev_upper)
@@ -50,36 +34,9 @@ def simulate_trades(market_data, initial_assets=10000, num_long_entry=3, num_lon
         df['LongExit'] = check_consecutive_closes(df, num_long_exit, direction='negative')
         df['ShortEntry'] = check_consecutive_closes(df, num_short_entry, direction='negative') & (df['Close'] < df['BB_Upper'])
         df['ShortExit'] = check_consecutive_closes(df, num_short_exit, direction='positive')
-        
-        current_positions[market] = None
-
-        for date, row in df.iterrows():
-            price = row['Close']
-            position = current_positions[market]
-
-            if position:
-                trade_type, entry_price = position
-                
-                if trade_type == 'Long' and row['LongExit']:
-                    profit = price - entry_price
-                    balance += profit
-                    trades.append((date, market, 'Long Exit', price, profit, balance))
-                    current_positions[market] = None
-                
-                elif trade_type == 'Short' and row['ShortExit']:
-                    profit = entry_price - price
-                    balance += profit
-                    trades.append((date, market, 'Short Exit', price, profit, balance))
-                    current_positions[market] = None
-
-            if not current_positions[market]:
-                if row['LongEntry']:
-                    current_positions[market] = ('Long', price)
-                    trades.append((date, market, 'Long Entry', price, 0, balance))
-                
-                elif row['ShortEntry']:
-                    current_positions[market] = ('Short', price)
-                    trades.append((date, market, 'Short Entry', price, 0, balance))
+
+        events, balance = simulate_positions(df['Close'], df['LongEntry'], df['LongExit'], df['ShortEntry'], df['ShortExit'], balance=balance)
+        trades.extend(trade_records(df.index, market, events))
 
     return trades, balance
 
@@ -163,6 +120,7 @@ def parse_arguments():
     parser.add_argument("--bollinger_window", "-bw", type=int, default=20, help="Window size for Bollinger Bands")
     parser.add_argument("--bollinger_std_dev_lower", "-bsdd", type=float, default=1.8, help="Standard deviation for Bollinger Lower Band")
     parser.add_argument("--bollinger_std_dev_upper", "-bsdu", type=float, default=1.8, help="Standard deviation for Bollinger Upper Band")
+    parser.add_argument("--calendar", "-c", choices=CALENDARS, default="daily", help="bar calendar: daily (forward filled), business, trading or union of trading days")
 
     args = parser.parse_args()
 
@@ -175,7 +133,7 @@ def main():
     if args.startday is not None:
         start_date = pd.Timestamp(args.startday)
 
-    market_data = load_data(directory)
+    market_data = load_data(directory, calendar=args.calendar)
     market_data = synchronize_start_dates(market_data, start_date)
     trades, final_balance = simulate_trades(market_data, 
                                             num_long_entry=args.long_entry,
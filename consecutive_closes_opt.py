@@ -1,25 +1,15 @@
-import os
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import argparse
 from itertools import product
+from functools import partial
+from indicators import add_streak_columns
+from market_data import CALENDARS, load_data, memory_savings
+from backtest_engine import simulate_positions, trade_records
+from parallel_search import best_parameters, parallel_grid_search
+from results_store import DEFAULT_STORE_PATH, ResultsStore, cached_profits, data_fingerprint
 
-def load_data(directory):
-    market_data = {}
-    if not os.path.exists(directory):
-        raise FileNotFoundError(f"The system cannot find the path specified: {directory}")
-
-    for file in os.listdir(directory):
-        if file.endswith('.csv'):
-            path = os.path.join(directory, file)
-            df = pd.read_csv(path, parse_dates=['Date'], index_col='Date', dayfirst=True)
-            df.index = pd.to_datetime(df.index)
-            df = df[~df.index.duplicated(keep='first')]
-            df = df.sort_index()
-            df = df.asfreq('D', method='ffill')
-            market_data[file.replace('.csv', '')] = df
-    return market_data
+STRATEGY_NAME = 'consecutive_closes_opt'
 
 def synchronize_start_dates(market_data, start_date):
     if start_date is None:
@@ -29,10 +19,13 @@ def synchronize_start_dates(market_data, start_date):
     return market_data
 
 def check_consecutive_closes(df, num_consecutive, direction='positive'):
+    # Streak lengths are computed once per market, every later call is a single comparison
+    if 'UpStreak' not in df.columns:
+        add_streak_columns(df)
     if direction == 'positive':
-        return (df['Close'].diff() > 0).rolling(window=num_consecutive).sum().eq(num_consecutive)
+        return df['UpStreak'] >= num_consecutive
     else:
-        return (df['Close'].diff() < 0).rolling(window=num_consecutive).sum().eq(num_consecutive)
+        return df['DownStreak'] >= num_consecutive
 
 def calculate_bollinger_bands(df, window, num_std_dev_lower, num_std_dev_upper):
     df['MA'] = df['Close'].rolling(window=window).mean()
@@ -43,43 +36,15 @@ def calculate_bollinger_bands(df, window, num_std_dev_lower, num_std_dev_upper):
 def simulate_trades(market_data, initial_assets=10000, num_long_entry=3, num_long_exit=2, num_short_entry=3, num_short_exit=2):
     balance = initial_assets
     trades = []
-    current_positions = {}  # Keep track of positions per market
 
     for market, df in market_data.items():
         df['LongEntry'] = check_consecutive_closes(df, num_long_entry, direction='positive')
         df['LongExit'] = check_consecutive_closes(df, num_long_exit, direction='negative')
         df['ShortEntry'] = check_consecutive_closes(df, num_short_entry, direction='negative')
         df['ShortExit'] = check_consecutive_closes(df, num_short_exit, direction='positive')
-        
-        current_positions[market] = None
-
-        for date, row in df.iterrows():
-            price = row['Close']
-            position = current_positions[market]
-
-            if position:
-                trade_type, entry_price = position
-                
-                if trade_type == 'Long' and row['LongExit']:
-                    profit = price - entry_price
-                    balance += profit
-                    trades.append((date, market, 'Long Exit', price, profit, balance))
-                    current_positions[market] = None
-                
-                elif trade_type == 'Short' and row['ShortExit']:
-                    profit = entry_price - price
-                    balance += profit
-                    trades.append((date, market, 'Short Exit', price, profit, balance))
-                    current_positions[market] = None
-
-            if not current_positions[market]:
-                if row['LongEntry']:
-                    current_positions[market] = ('Long', price)
-                    trades.append((date, market, 'Long Entry', price, 0, balance))
-                
-                elif row['ShortEntry']:
-                    current_positions[market] = ('Short', price)
-                    trades.append((date, market, 'Short Entry', price, 0, balance))
+
+        events, balance = simulate_positions(df['Close'], df['LongEntry'], df['LongExit'], df['ShortEntry'], df['ShortExit'], balance=balance)
+        trades.extend(trade_records(df.index, market, events))
 
     return trades, balance
 
@@ -157,66 +122,104 @@ def parse_arguments():
     parser.add_argument("--long_entry", "-le", type=int, default=3, help="Number of consecutive positive closes for long entry")
     parser.add_argument("--long_exit", "-lx", type=int, default=2, help="Number of consecutive negative closes for long exit")
     parser.add_argument("--short_entry", "-se", type=int, default=3, help="Number of consecutive negative closes for short entry")
-    parser.add_argument("--short_exit", "-sx", type=int, default=2, help="Number of consecutive positive closes for short exit")\
+    parser.add_argument("--short_exit", "-sx", type=int, default=2, help="Number of consecutive positive closes for short exit")
+    parser.add_argument("--calendar", "-c", choices=CALENDARS, default="daily", help="bar calendar: daily (forward filled), business, trading or union of trading days")
+    parser.add_argument("--compact", action="store_true", default=False, help="load only Close prices as float32 to save memory")
+    parser.add_argument("--workers", "-w", type=int, default=None, help="split the parameter grid across this many processes, 0 uses every core")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="SQLite file of evaluated parameter sets, reruns skip them and interrupted sweeps resume")
+    parser.add_argument("--no_store", action="store_true", default=False, help="evaluate every parameter set without reading or writing the results store")
 
     args = parser.parse_args()
 
     return args
 
-def optimize_strategy(market_data, initial_assets=10000, long_entry_range=(2, 4), long_exit_range=(1, 3), short_entry_range=(2, 4), short_exit_range=(1, 3)):
-    best_profit = -np.inf
-    best_params = None
-
-    parameter_grid = product(
+def build_parameter_grid(long_entry_range=(2, 4), long_exit_range=(1, 3), short_entry_range=(2, 4), short_exit_range=(1, 3)):
+    return list(product(
         range(*long_entry_range),
         range(*long_exit_range),
         range(*short_entry_range),
         range(*short_exit_range)
-    )
+    ))
 
-    log_file = "optimization_log.txt"
+def write_optimization_log(parameter_grid, profits, log_file="optimization_log.txt"):
     with open(log_file, 'w') as f:
         f.write("le, lx, se, sx, total_profit\n")
-        
-    for params in parameter_grid:
-        le, lx, se, sx = params
-        _, total_profit = simulate_trades(
-            market_data,
-            initial_assets=initial_assets,
-            num_long_entry=le,
-            num_long_exit=lx,
-            num_short_entry=se,
-            num_short_exit=sx
-        )
-        
-        with open(log_file, 'a') as f:
-            f.write(f"{le}, {lx}, {se}, {sx}, {total_profit:.2f}\n")
+        f.writelines(f"{le}, {lx}, {se}, {sx}, {total_profit:.2f}\n" for (le, lx, se, sx), total_profit in zip(parameter_grid, profits))
+
+def store_fingerprint(market_data, initial_assets, results_store):
+    return None if results_store is None else data_fingerprint(market_data, initial_assets)
+
+def optimize_strategy(market_data, initial_assets=10000, long_entry_range=(2, 4), long_exit_range=(1, 3), short_entry_range=(2, 4), short_exit_range=(1, 3), results_store=None):
+    parameter_grid = build_parameter_grid(long_entry_range, long_exit_range, short_entry_range, short_exit_range)
+
+    def evaluate(pending, on_chunk):
+        for params in pending:
+            le, lx, se, sx = params
+            _, total_profit = simulate_trades(
+                market_data,
+                initial_assets=initial_assets,
+                num_long_entry=le,
+                num_long_exit=lx,
+                num_short_entry=se,
+                num_short_exit=sx
+            )
             print(f"[-] Long Entry={le}, Long Exit={lx}, Short Entry={se}, Short Exit={sx}, total_profit={total_profit:.2f}")
-        
-        if total_profit > best_profit:
-            best_profit = total_profit
-            best_params = params
+            on_chunk([params], [total_profit])
+
+    fingerprint = store_fingerprint(market_data, initial_assets, results_store)
+    profits = cached_profits(results_store, fingerprint, STRATEGY_NAME, parameter_grid, evaluate)
+    write_optimization_log(parameter_grid, profits)
+    return best_parameters(parameter_grid, profits)
 
-    return best_params, best_profit
+def evaluate_parameter_chunk(market_data, chunk, initial_assets=10000):
+    return [simulate_trades(market_data, initial_assets, le, lx, se, sx)[1] for le, lx, se, sx in chunk]
+
+def optimize_strategy_parallel(market_data, initial_assets=10000, long_entry_range=(2, 4), long_exit_range=(1, 3), short_entry_range=(2, 4), short_exit_range=(1, 3), workers=0, results_store=None):
+    """ optimize_strategy with the grid split into chunks across worker processes, same log and best parameters. """
+    parameter_grid = build_parameter_grid(long_entry_range, long_exit_range, short_entry_range, short_exit_range)
+    evaluate_chunk = partial(evaluate_parameter_chunk, initial_assets=initial_assets)
+
+    def evaluate(pending, on_chunk):
+        _, rate = parallel_grid_search(evaluate_chunk, market_data, pending, workers=workers, on_chunk=on_chunk)
+        print(f"Evaluated {len(pending)} parameter sets with {workers or 'all'} workers: {rate:,.1f} evaluations/s")
+
+    fingerprint = store_fingerprint(market_data, initial_assets, results_store)
+    profits = cached_profits(results_store, fingerprint, STRATEGY_NAME, parameter_grid, evaluate)
+    write_optimization_log(parameter_grid, profits)
+    return best_parameters(parameter_grid, profits)
 
 def main():
     args = parse_arguments()
 
     # Load market data
-    market_data = load_data("MarketData")
+    if args.compact:
+        market_data = load_data("MarketData", calendar=args.calendar, columns=['Close'], compact=True)
+        used, full, saved = memory_savings(market_data)
+        print(f"Compact market data: {used / 1e6:.1f} MB instead of {full / 1e6:.1f} MB ({saved / 1e6:.1f} MB saved)")
+    else:
+        market_data = load_data("MarketData", calendar=args.calendar)
 
     # Synchronize start dates
     market_data = synchronize_start_dates(market_data, args.startday)
 
     # Optimize strategy
-    best_params, best_profit = optimize_strategy(
+    if args.workers is None:
+        optimize = optimize_strategy
+    else:
+        optimize = partial(optimize_strategy_parallel, workers=args.workers)
+    # Pending results are flushed even if the sweep is interrupted
+    results_store = None if args.no_store else ResultsStore(args.store)
+    best_params, best_profit = optimize(
         market_data,
         initial_assets=10000,
         long_entry_range=(2, 6),
         long_exit_range=(1, 3),
         short_entry_range=(2, 6),
-        short_exit_range=(1, 3)
+        short_exit_range=(1, 3),
+        results_store=results_store
     )
+    if results_store is not None:
+        results_store.close()
 
     le, lx, se, sx = best_params
 
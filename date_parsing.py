@@ -0,0 +1,78 @@
+import pandas as pd
+from dateutil.parser import parse
+
+# Tried in order, the first format that parses the most sampled rows wins
+DATE_FORMATS = [
+    '%d/%m/%Y',
+    '%d/%m/%y',
+    '%d-%b-%y',
+    '%d-%b-%Y',
+    '%d-%m-%Y',
+    '%d %b %Y',
+    '%d %B %Y',
+    '%Y-%m-%d',
+    '%Y-%m-%d %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+    '%d/%m/%Y %H:%M:%S',
+]
+EXCEL_FORMAT = 'excel'
+EXCEL_EPOCH = '1899-12-30'
+# Serial day numbers between 1950 and 2100, anything else is not treated as an Excel date
+EXCEL_SERIAL_RANGE = (18264, 73051)
+
+def parse_date(date_str, dayfirst=True):
+    """ Slow flexible parse of a single value, NaT when it cannot be parsed. """
+    try:
+        return pd.Timestamp(parse(str(date_str).strip(), dayfirst=dayfirst))
+    except (ValueError, OverflowError, TypeError):
+        return pd.NaT
+
+def excel_serial_to_datetime(values):
+    return pd.to_datetime(values, unit='D', origin=EXCEL_EPOCH, errors='coerce')
+
+def _looks_like_excel_serial(sample):
+    numbers = pd.to_numeric(sample, errors='coerce')
+    if numbers.isna().any():
+        return False
+    return bool(numbers.between(*EXCEL_SERIAL_RANGE).all())
+
+def detect_date_format(values, sample_size=1000):
+    """ Guess the format of a date column from a sample of its non-empty values. """
+    sample = pd.Series(values).dropna()
+    if sample.empty:
+        return None
+    sample = sample.iloc[:sample_size]
+    if pd.api.types.is_numeric_dtype(sample) or _looks_like_excel_serial(sample):
+        return EXCEL_FORMAT
+
+    sample = sample.astype(str).str.strip()
+    best_format, best_count = None, 0
+    for date_format in DATE_FORMATS:
+        count = pd.to_datetime(sample, format=date_format, errors='coerce').notna().sum()
+        if count > best_count:
+            best_format, best_count = date_format, count
+            if count == len(sample):
+                break
+    return best_format
+
+def parse_dates(values, dayfirst=True, date_format=None):
+    """
+    Parse a date column with one vectorised pass using the detected format.
+    Rows that do not match fall back to dateutil one by one, unparseable rows become NaT.
+    """
+    series = pd.Series(values)
+    if date_format is None:
+        date_format = detect_date_format(series)
+
+    if date_format is None:
+        parsed = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    elif date_format == EXCEL_FORMAT:
+        parsed = excel_serial_to_datetime(pd.to_numeric(series, errors='coerce'))
+    else:
+        parsed = pd.to_datetime(series.astype(str).str.strip(), format=date_format, errors='coerce')
+    parsed = parsed.astype('datetime64[ns]')
+
+    failed = parsed.isna() & series.notna()
+    if failed.any():
+        parsed[failed] = [parse_date(value, dayfirst=dayfirst) for value in series[failed]]
+    return parsed
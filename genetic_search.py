@@ -0,0 +1,70 @@
+import time
+import numpy as np
+
+def evolve(space, evaluate, population_size=64, generations=50, elite=4, mutation_rate=0.2, tournament_size=3, seed=0, time_budget=None, on_generation=None):
+    """
+    Genetic algorithm over a product of ordered value lists, maximising evaluate.
+
+    space is a list of value sequences, one per parameter. evaluate(list of parameter tuples)
+    scores a whole generation in one call and returns one fitness per tuple; individuals seen
+    before reuse their fitness. The elite best individuals survive unchanged, the rest are
+    bred by tournament selection, uniform crossover and mutation (a step of a few positions
+    along the value list). Stops after generations or once time_budget seconds have passed.
+    on_generation(generation, best_params, best_fitness, evaluations, evaluations_per_second)
+    is called after every generation that has a finite best fitness. Returns (best_params, best_fitness, history) with
+    history as (generation, best_fitness, evaluations, evaluations_per_second) tuples.
+    """
+    rng = np.random.default_rng(seed)
+    space = [list(values) for values in space]
+    sizes = np.array([len(values) for values in space])
+    elite = min(elite, population_size)
+
+    fitness_cache = {}
+    history = []
+    start = time.perf_counter()
+
+    def decode(individual):
+        return tuple(space[d][i] for d, i in enumerate(individual))
+
+    def score(population):
+        individuals = [tuple(int(i) for i in row) for row in population]
+        pending = list(dict.fromkeys(individual for individual in individuals if individual not in fitness_cache))
+        if pending:
+            fitness = evaluate([decode(individual) for individual in pending])
+            fitness_cache.update(zip(pending, (np.nan if value is None else float(value) for value in fitness)))
+        # NaN fitness never wins a tournament or an elite place
+        return np.nan_to_num(np.array([fitness_cache[individual] for individual in individuals]), nan=-np.inf)
+
+    def tournament(fitness):
+        contenders = rng.integers(len(fitness), size=tournament_size)
+        return contenders[np.argmax(fitness[contenders])]
+
+    population = rng.integers(sizes, size=(population_size, len(sizes)))
+    best_individual, best_fitness = None, -np.inf
+    for generation in range(generations):
+        fitness = score(population)
+        leader = int(np.argmax(fitness))
+        if fitness[leader] > best_fitness:
+            best_individual, best_fitness = tuple(int(i) for i in population[leader]), fitness[leader]
+
+        elapsed = time.perf_counter() - start
+        rate = len(fitness_cache) / elapsed if elapsed > 0 else float('inf')
+        history.append((generation, best_fitness, len(fitness_cache), rate))
+        if on_generation is not None and best_individual is not None:
+            on_generation(generation, decode(best_individual), best_fitness, len(fitness_cache), rate)
+        if generation == generations - 1 or (time_budget is not None and elapsed >= time_budget):
+            break
+
+        order = np.argsort(-fitness, kind='stable')
+        children = [population[i].copy() for i in order[:elite]]
+        while len(children) < population_size:
+            mother, father = population[tournament(fitness)], population[tournament(fitness)]
+            child = np.where(rng.random(len(sizes)) < 0.5, mother, father)
+            mutate = rng.random(len(sizes)) < mutation_rate
+            # Steps scale with the number of values so every parameter can move across its range
+            steps = np.rint(rng.normal(0, np.maximum(1, sizes / 6))).astype(np.int64)
+            child = np.where(mutate, np.clip(child + steps, 0, sizes - 1), child)
+            children.append(child)
+        population = np.array(children)
+
+    return (decode(best_individual) if best_individual else None), best_fitness, history
@@ -0,0 +1,250 @@
+# python indicators.py
+# Checks rolling_mean_std against pandas rolling() on a price history that changes level 1000x.
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+def run_lengths(flags):
+    """ For each position, how many True values end there (0 where flags is False). """
+    flags = np.asarray(flags, dtype=bool)
+    positions = np.arange(len(flags))
+    last_false = np.maximum.accumulate(np.where(flags, -1, positions))
+    return positions - last_false
+
+def consecutive_streaks(close):
+    """
+    Up and down streak lengths of a close series: up[t] is the number of consecutive
+    positive closes ending at bar t, so 'N consecutive positive closes' is up >= N.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    diff = np.empty_like(close)
+    diff[0:1] = np.nan
+    diff[1:] = close[1:] - close[:-1]
+    # NaN compares False in both directions, the same as the rolling-window check
+    return run_lengths(diff > 0), run_lengths(diff < 0)
+
+def add_streak_columns(df):
+    """ Store UpStreak/DownStreak on df once so any number of consecutive closes is one comparison. """
+    up, down = consecutive_streaks(df['Close'].to_numpy())
+    df['UpStreak'] = up
+    df['DownStreak'] = down
+    return df
+
+def rolling_mean_std(values, windows, ddof=1):
+    """
+    Rolling mean and standard deviation of one series for several windows in a single pass.
+    Prefix sums of x and x^2 restart every max(windows) bars and each block is shifted by its
+    own first value, so the sum-of-squares subtraction only sees nearby prices even when the
+    series trades at very different levels over its history. Returns two (windows x dates)
+    arrays, NaN until a window is full or while it contains a NaN, like pandas rolling().
+    """
+    x = np.asarray(values, dtype=np.float64)
+    windows = np.asarray(windows, dtype=np.int64)
+    n = len(x)
+    means = np.full((len(windows), n), np.nan)
+    stds = np.full((len(windows), n), np.nan)
+    usable = windows[(windows >= 1) & (windows <= n)]
+    if len(usable) == 0:
+        return means, stds
+
+    # Blocks of at least the longest window, so any window spans one block or two neighbours
+    block = int(usable.max())
+    num_blocks = -(-n // block)
+    padded = np.full(num_blocks * block, np.nan)
+    padded[:n] = x
+    blocks = padded.reshape(num_blocks, block)
+    missing = np.isnan(blocks)
+    first_valid = np.argmax(~missing, axis=1)
+    anchor = blocks[np.arange(num_blocks), first_valid]
+    anchor = np.where(np.isnan(anchor), 0.0, anchor)
+    shifted = np.where(missing, 0.0, blocks - anchor[:, None])
+
+    # Per bar: sums of its block before it and up to it, the block total and the bars left to the
+    # block end, all relative to the block's anchor and flattened back to n bars
+    before1 = (np.cumsum(shifted, axis=1) - shifted).ravel()[:n]
+    before2 = (np.cumsum(shifted * shifted, axis=1) - shifted * shifted).ravel()[:n]
+    upto1 = before1 + shifted.ravel()[:n]
+    upto2 = before2 + (shifted * shifted).ravel()[:n]
+    total1 = np.repeat(shifted.sum(axis=1), block)[:n]
+    total2 = np.repeat((shifted * shifted).sum(axis=1), block)[:n]
+    bar_anchor = np.repeat(anchor, block)[:n]
+    block_id = np.arange(n) // block
+    to_block_end = (block_id + 1) * block - np.arange(n)
+    nan_count = np.concatenate(([0], np.cumsum(np.isnan(x))))
+
+    for i, window in enumerate(windows):
+        if window < 1 or window > n:
+            continue
+        first, last = slice(0, n - window + 1), slice(window - 1, n)
+        sum1, sum2 = upto1[last].copy(), upto2[last].copy()
+        # A window reaching back into the previous block adds that block's tail, moved onto the later anchor
+        spill = block_id[first] != block_id[last]
+        tail1 = total1[first] - before1[first]
+        tail2 = total2[first] - before2[first]
+        delta = bar_anchor[first] - bar_anchor[last]
+        bars = to_block_end[first]
+        sum1 += np.where(spill, tail1 + bars * delta, -before1[first])
+        sum2 += np.where(spill, tail2 + 2 * delta * tail1 + bars * delta * delta, -before2[first])
+
+        complete = (nan_count[window:] - nan_count[:n - window + 1]) == 0
+        mean = sum1 / window
+        means[i, last] = np.where(complete, mean + bar_anchor[last], np.nan)
+        if window > ddof:
+            # Rounding can leave tiny negative variances for flat windows, clamp them to zero
+            var = np.maximum(sum2 - sum1 * mean, 0.0) / (window - ddof)
+            stds[i, last] = np.where(complete, np.sqrt(var), np.nan)
+    return means, stds
+
+def rolling_mean_2d(values, window, valid=None):
+    """
+    Rolling mean down each column of a (dates x symbols) array, NaN while the window is incomplete.
+    With a PricePanel's valid mask each column's window runs over that symbol's own bars only.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    result = np.full(x.shape, np.nan)
+    if valid is not None and not valid.all():
+        for j in range(x.shape[1]):
+            rows = np.flatnonzero(valid[:, j])
+            result[rows, j] = rolling_mean_2d(x[rows, j, np.newaxis], window)[:, 0]
+        return result
+    if window < 1 or window > len(x):
+        return result
+
+    missing = np.isnan(x)
+    has_missing = missing.any()
+    # Shift each column by its first valid value so the running sums stay small
+    first_valid = np.argmax(~missing, axis=0) if has_missing else np.zeros(x.shape[1], dtype=np.int64)
+    shift = x[first_valid, np.arange(x.shape[1])]
+    shift = np.where(np.isnan(shift), 0.0, shift)
+
+    sums = np.zeros((len(x) + 1, x.shape[1]))
+    shifted = x - shift
+    if has_missing:
+        shifted[missing] = 0.0
+    np.cumsum(shifted, axis=0, out=sums[1:])
+    window_mean = sums[window:] - sums[:-window]
+    window_mean /= window
+    window_mean += shift
+    if has_missing:
+        nan_count = np.zeros((len(x) + 1, x.shape[1]), dtype=np.int32)
+        np.cumsum(missing, axis=0, out=nan_count[1:])
+        window_mean[(nan_count[window:] - nan_count[:-window]) > 0] = np.nan
+    result[window - 1:] = window_mean
+    return result
+
+def highest_abs_index(values):
+    """
+    Per row, the column with the largest absolute value. Matches max(..., key=abs) over the
+    columns in order: a NaN in the first column wins, NaNs elsewhere are skipped.
+    """
+    magnitude = np.abs(np.asarray(values, dtype=np.float64))
+    highest = np.argmax(np.where(np.isnan(magnitude), -np.inf, magnitude), axis=1)
+    highest[np.isnan(magnitude[:, 0])] = 0
+    return highest
+
+def momentum_and_ma(close, window=14, valid=None):
+    """
+    Momentum (close - close window bars earlier), moving average and the per-date column of
+    the largest |momentum| for a whole (dates x symbols) close matrix in one call. Pass the
+    panel's valid mask when symbols have gaps on the date axis, bars are then counted per symbol
+    like the per-market diff and rolling do.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    momentum = np.full(close.shape, np.nan)
+    if valid is not None and not valid.all():
+        for j in range(close.shape[1]):
+            rows = np.flatnonzero(valid[:, j])
+            if 0 < window < len(rows):
+                momentum[rows[window:], j] = close[rows[window:], j] - close[rows[:-window], j]
+    elif 0 < window < len(close):
+        momentum[window:] = close[window:] - close[:-window]
+    ma = rolling_mean_2d(close, window, valid)
+    return momentum, ma, highest_abs_index(momentum)
+
+class IndicatorCache:
+    """
+    Memoises indicator series per (symbol, indicator, parameters) with LRU eviction.
+    One cache belongs to one loaded dataset, e.g. a single optimize_strategy run.
+    Streaks are not cached here, add_streak_columns keeps them on the market's frame.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, symbol, indicator, params, compute):
+        key = (symbol, indicator, params)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        self.misses += 1
+        value = compute()
+        self._entries[key] = value
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def rolling_mean(self, symbol, close, window):
+        return self.get(symbol, 'rolling_mean', (window,), lambda: close.rolling(window=window).mean())
+
+    def rolling_std(self, symbol, close, window):
+        return self.get(symbol, 'rolling_std', (window,), lambda: close.rolling(window=window).std())
+
+    def prime_rolling_stats(self, symbol, close, windows):
+        """ Fill rolling_mean/rolling_std for every window with one rolling_mean_std pass. """
+        windows = [int(window) for window in windows]
+        means, stds = rolling_mean_std(close.to_numpy(), windows)
+        for i, window in enumerate(windows):
+            mean = pd.Series(means[i], index=close.index, name=close.name)
+            std = pd.Series(stds[i], index=close.index, name=close.name)
+            self.get(symbol, 'rolling_mean', (window,), lambda: mean)
+            self.get(symbol, 'rolling_std', (window,), lambda: std)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+def check_rolling_mean_std(windows=range(15, 26), num_bars=5000, tolerance=1e-8, seed=0):
+    """
+    Compare rolling_mean_std with pandas rolling() on num_bars near 0.5 followed by num_bars
+    near 500, plus a few NaNs. Returns the largest relative std error.
+    """
+    rng = np.random.default_rng(seed)
+    x = np.concatenate([0.5 * np.exp(np.cumsum(rng.normal(0, 0.01, num_bars))),
+                        500 * np.exp(np.cumsum(rng.normal(0, 0.01, num_bars)))])
+    x[rng.integers(len(x), size=4)] = np.nan
+    windows = list(windows)
+    means, stds = rolling_mean_std(x, windows)
+    worst = 0.0
+    for i, window in enumerate(windows):
+        rolling = pd.Series(x).rolling(window)
+        expected_mean, expected_std = rolling.mean().to_numpy(), rolling.std().to_numpy()
+        if not (np.array_equal(np.isnan(means[i]), np.isnan(expected_mean)) and np.array_equal(np.isnan(stds[i]), np.isnan(expected_std))):
+            raise AssertionError(f"rolling_mean_std NaNs differ from pandas for window {window}")
+        valid = ~np.isnan(expected_std) & (expected_std > 0)
+        error = np.max(np.abs(stds[i][valid] - expected_std[valid]) / expected_std[valid])
+        if error > tolerance or not np.allclose(means[i], expected_mean, rtol=tolerance, equal_nan=True):
+            raise AssertionError(f"rolling_mean_std differs from pandas for window {window}: relative std error {error:.2e}")
+        worst = max(worst, error)
+    return worst
+
+if __name__ == '__main__':
+    print(f"rolling_mean_std matches pandas across a 1000x price level change, largest relative std error {check_rolling_mean_std():.2e}")
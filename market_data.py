@@ -0,0 +1,283 @@
+import io
+import os
+import hashlib
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+import pandas as pd
+from date_parsing import parse_dates
+
+CACHE_DIR_NAME = '.cache'
+CACHE_VERSION = 4
+HASH_BLOCK_BYTES = 1 << 20
+# daily:    every calendar day, weekends and holidays forward filled (original behaviour)
+# business: Monday to Friday, holidays forward filled
+# trading:  only the bars present in each file
+# union:    every date on which any symbol traded, gaps forward filled per symbol
+CALENDARS = ('daily', 'business', 'trading', 'union')
+MARKET_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume')
+
+def apply_calendar(df, calendar='daily'):
+    if calendar == 'daily':
+        df = df.asfreq('D', method='ffill')
+    elif calendar == 'business':
+        df = df.asfreq('B', method='ffill')
+    return df
+
+def clean_market_rows(df, compact=False):
+    """ Parse the Date index, drop duplicate dates (first wins) and sort. """
+    if compact:
+        float_columns = df.select_dtypes(include='float').columns
+        df[float_columns] = df[float_columns].astype(np.float32)
+    df.index = pd.DatetimeIndex(parse_dates(df.index).to_numpy(), name='Date')
+    df = df[~df.index.duplicated(keep='first')]
+    df = df.sort_index()
+    return df
+
+def read_market_rows(path, columns=None, compact=False):
+    """ The cleaned rows of one MarketData CSV before any calendar is applied. """
+    usecols = None if columns is None else ['Date', *columns]
+    df = pd.read_csv(path, index_col='Date', usecols=usecols)
+    return clean_market_rows(df, compact)
+
+def read_market_csv(path, calendar='daily', columns=None, compact=False):
+    """
+    Parse one MarketData CSV into a cleaned DataFrame on the requested calendar.
+    columns keeps only the listed price columns, compact stores float columns as float32.
+    """
+    return apply_calendar(read_market_rows(path, columns, compact), calendar)
+
+def file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def read_source_columns(path):
+    return [str(col) for col in pd.read_csv(path, nrows=0).columns]
+
+def prefix_hash(f, offset):
+    """
+    Hash of every byte before offset, used to tell an appended file from a rewritten one.
+    Hashing needs no parsing, so it stays cheap next to reading the whole history again,
+    and an in-place correction anywhere in the history forces a rebuild.
+    """
+    digest = hashlib.sha1()
+    last_bytes = b''
+    f.seek(0)
+    remaining = offset
+    while remaining > 0:
+        block = f.read(min(remaining, HASH_BLOCK_BYTES))
+        if not block:
+            break
+        digest.update(block)
+        last_bytes = block
+        remaining -= len(block)
+    return digest.hexdigest(), last_bytes.endswith(b'\n')
+
+def cache_file_path(cache_dir, path, calendar='daily', columns=None, compact=False):
+    # One cache entry per source file and load options, named after the symbol plus a hash of the full path
+    key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(path))[0]
+    variant = calendar
+    if columns is not None or compact:
+        variant += '-' + hashlib.sha1(repr((list(columns or []), compact)).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{name}-{key}-{variant}.npz")
+
+def save_cached_frame(cache_file, df, path, signature, source_columns, last_row):
+    """
+    Store a frame column by column in an uncompressed .npz archive, with the source file's state.
+    last_row is the last source row as a one-row frame. The calendar may have dropped it, e.g. a
+    weekend bar under 'business', but it still fills the bars that follow it.
+    """
+    with open(path, 'rb') as f:
+        source_hash, _ = prefix_hash(f, signature[1])
+    arrays = {
+        'version': np.array(CACHE_VERSION),
+        'mtime_ns': np.array(signature[0], dtype=np.int64),
+        'size': np.array(signature[1], dtype=np.int64),
+        'prefix_hash': np.array(source_hash),
+        'source_columns': np.array(source_columns),
+        'index': df.index.values.astype('datetime64[ns]'),
+        'index_name': np.array(df.index.name or ''),
+        'freq': np.array(df.index.freqstr or ''),
+        'columns': np.array([str(col) for col in df.columns]),
+        'last_index': last_row.index.values.astype('datetime64[ns]'),
+    }
+    for i, col in enumerate(df.columns):
+        arrays[f'col_{i}'] = df[col].to_numpy()
+        arrays[f'last_{i}'] = last_row[col].to_numpy()
+
+    # Write to a temporary file first so a crash never leaves a half-written entry behind
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_file, cache_file)
+
+def load_cache_entry(cache_file):
+    """ Return (frame, metadata) for a cache entry, or None if it is missing or unreadable. """
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with np.load(cache_file, allow_pickle=False) as archive:
+            if int(archive['version']) != CACHE_VERSION:
+                return None
+            meta = {
+                'mtime_ns': int(archive['mtime_ns']),
+                'size': int(archive['size']),
+                'prefix_hash': str(archive['prefix_hash']),
+                'source_columns': [str(col) for col in archive['source_columns']],
+            }
+            index = pd.DatetimeIndex(archive['index'], name=str(archive['index_name']) or None)
+            freq = str(archive['freq'])
+            if freq:
+                index.freq = freq
+            columns = [str(col) for col in archive['columns']]
+            data = {col: archive[f'col_{i}'] for i, col in enumerate(columns)}
+            meta['last_row'] = pd.DataFrame({col: archive[f'last_{i}'] for i, col in enumerate(columns)},
+                                            index=pd.DatetimeIndex(archive['last_index'], name=index.name), columns=columns)
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        # Corrupt or unreadable entry, rebuild it from the CSV
+        return None
+    return pd.DataFrame(data, index=index, columns=columns), meta
+
+def append_market_rows(path, cached, meta, calendar='daily', columns=None, compact=False):
+    """
+    Merge the rows appended to path since the cache entry was written into the cached frame.
+    Only the bytes after the stored offset are parsed. Returns (frame, last source row), or None
+    when the file was not a pure append (any byte before the offset changed, or new rows are dated
+    before the last source row), in which case the caller rebuilds from the whole file.
+    """
+    offset = meta['size']
+    with open(path, 'rb') as f:
+        source_hash, ends_with_newline = prefix_hash(f, offset)
+        if source_hash != meta['prefix_hash'] or not ends_with_newline:
+            return None
+        f.seek(offset)
+        appended = f.read()
+    last_row = meta['last_row']
+    if not appended.strip():
+        return cached, last_row
+
+    usecols = None if columns is None else ['Date', *columns]
+    new_rows = pd.read_csv(io.BytesIO(appended), header=None, names=meta['source_columns'], index_col='Date', usecols=usecols)
+    new_rows = clean_market_rows(new_rows, compact)
+    if new_rows.index.isna().any():
+        return None
+    # Integer-looking prices parse as int64, keep the cached (possibly float32) column types
+    new_rows = new_rows.astype({col: dtype for col, dtype in cached.dtypes.items() if col in new_rows.columns and dtype.kind == 'f'})
+
+    # Compare with the last source row, the calendar may have dropped it from the cached frame
+    last_date = last_row.index[-1] if len(last_row) else pd.Timestamp.min
+    if (new_rows.index < last_date).any():
+        return None
+    # A repeated last date keeps the row already in the cache, as the full load would
+    new_rows = new_rows[new_rows.index > last_date]
+    if new_rows.empty:
+        return cached, last_row
+    # Put a dropped last source row back so the calendar forward fills from it, as the full load does
+    dropped = last_row[~last_row.index.isin(cached.index)]
+    return apply_calendar(pd.concat([cached, dropped, new_rows]), calendar), new_rows.iloc[-1:]
+
+def load_market_file(path, cache_dir=None, calendar='daily', columns=None, compact=False):
+    """
+    Load one CSV, going through the binary cache when cache_dir is set.
+    Files that only grew since they were cached are updated from the appended bytes.
+    """
+    if cache_dir is None:
+        return read_market_csv(path, calendar, columns, compact)
+
+    signature = file_signature(path)
+    cache_file = cache_file_path(cache_dir, path, calendar, columns, compact)
+    entry = load_cache_entry(cache_file)
+    if entry is not None:
+        cached, meta = entry
+        if (meta['mtime_ns'], meta['size']) == signature:
+            return cached
+        if signature[1] > meta['size']:
+            appended = append_market_rows(path, cached, meta, calendar, columns, compact)
+            if appended is not None:
+                df, last_row = appended
+                save_cached_frame(cache_file, df, path, signature, meta['source_columns'], last_row)
+                return df
+
+    rows = read_market_rows(path, columns, compact)
+    df = apply_calendar(rows, calendar)
+    save_cached_frame(cache_file, df, path, signature, read_source_columns(path), rows.iloc[-1:])
+    return df
+
+def trading_dates(market_data):
+    """ Sorted union of the dates present in any symbol. """
+    dates = pd.DatetimeIndex([], name='Date')
+    for df in market_data.values():
+        dates = dates.union(df.index)
+    return dates
+
+def align_to_union(market_data):
+    """ Reindex every symbol onto the union of trading days between its own first and last bar. """
+    dates = trading_dates(market_data)
+    for market, df in market_data.items():
+        if df.empty:
+            continue
+        own_dates = dates[(dates >= df.index[0]) & (dates <= df.index[-1])]
+        market_data[market] = df.reindex(own_dates, method='ffill')
+    return market_data
+
+def memory_savings(market_data):
+    """ Bytes used by market_data vs. the same bars with every MarketData column as 64-bit values. """
+    used = sum(int(df.memory_usage(index=True, deep=True).sum()) for df in market_data.values())
+    full = sum(len(df) * 8 * (len(MARKET_COLUMNS) + 1) for df in market_data.values())
+    return used, full, full - used
+
+def load_data(directory, use_cache=True, cache_dir=None, workers=None, calendar='daily', columns=None, compact=False):
+    """
+    Load every CSV in directory. workers > 1 parses files in a process pool, 0 uses every core.
+    columns, e.g. ['Close'], prunes unused price columns and compact stores prices as float32.
+    """
+    market_data = {}
+    if not os.path.exists(directory):
+        raise FileNotFoundError(f"The system cannot find the path specified: {directory}")
+    if calendar not in CALENDARS:
+        raise ValueError(f"Unknown calendar '{calendar}', expected one of {CALENDARS}")
+    # Union alignment needs every symbol, so files are loaded on their own trading days first
+    file_calendar = 'trading' if calendar == 'union' else calendar
+
+    if use_cache:
+        if cache_dir is None:
+            cache_dir = os.path.join(directory, CACHE_DIR_NAME)
+        os.makedirs(cache_dir, exist_ok=True)
+    else:
+        cache_dir = None
+
+    files = [file for file in os.listdir(directory) if file.endswith('.csv')]
+    paths = [os.path.join(directory, file) for file in files]
+
+    load_file = partial(load_market_file, cache_dir=cache_dir, calendar=file_calendar, columns=columns, compact=compact)
+    if workers == 0:
+        workers = os.cpu_count()
+    if workers is None or workers <= 1 or len(paths) <= 1:
+        frames = [load_file(path) for path in paths]
+    else:
+        # Hand each worker a batch of files to keep pickling overhead per task low
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            frames = list(executor.map(load_file, paths, chunksize=chunksize))
+
+    for file, df in zip(files, frames):
+        market_data[file.replace('.csv', '')] = df
+
+    if calendar == 'union':
+        market_data = align_to_union(market_data)
+    return market_data
+
+def clear_cache(directory, cache_dir=None):
+    """ Remove every cached entry for a MarketData directory. """
+    if cache_dir is None:
+        cache_dir = os.path.join(directory, CACHE_DIR_NAME)
+    if not os.path.isdir(cache_dir):
+        return 0
+    removed = 0
+    for file in os.listdir(cache_dir):
+        if file.endswith('.npz'):
+            os.remove(os.path.join(cache_dir, file))
+            removed += 1
+    return removed
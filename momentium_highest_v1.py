@@ -1,25 +1,9 @@
 # python momentium_highest_v1.py -s "2024-03-01" -m 100
 # you can set Max momentum by using m parameter.
-import os
 import pandas as pd
 import matplotlib.pyplot as plt
 import argparse
-
-def load_data(directory):
-    market_data = {}
-    if not os.path.exists(directory):
-        raise FileNotFoundError(f"The system cannot find the path specified: {directory}")
-
-    for file in os.listdir(directory):
-        if file.endswith('.csv'):
-            path = os.path.join(directory, file)
-            df = pd.read_csv(path, parse_dates=['Date'], index_col='Date', dayfirst=True)
-            df.index = pd.to_datetime(df.index)
-            df = df[~df.index.duplicated(keep='first')]
-            df = df.sort_index()
-            df = df.asfreq('D', method='ffill')
-            market_data[file.replace('.csv', '')] = df
-    return market_data
+from market_data import CALENDARS, load_data, trading_dates
 
 def synchronize_start_dates(market_data, start_date):
     if start_date == None:
@@ -39,8 +23,7 @@ def simulate_trades(market_data, initial_assets=10000, max_momentum=0):
     trades = []
     current_position = None
 
-    all_dates = pd.date_range(start=min(df.index.min() for df in market_data.values()),
-                              end=max(df.index.max() for df in market_data.values()))
+    all_dates = trading_dates(market_data)
 
     for date in all_dates:
         if not all(date in df.index for df in market_data.values()):
@@ -160,6 +143,7 @@ def parse_arguments():
     parser.add_argument("--startday", "-s", help="start day, ex: 2024-04-24")
     # Add arguments
     parser.add_argument("--maxmomentum", "-m", type=float, help="max momentum")
+    parser.add_argument("--calendar", "-c", choices=CALENDARS, default="daily", help="bar calendar: daily (forward filled), business, trading or union of trading days")
 
     args = parser.parse_args()
 
@@ -176,7 +160,7 @@ def main():
     if args.maxmomentum != None:
         max_momentum = args.maxmomentum
 
-    market_data = load_data(directory)
+    market_data = load_data(directory, calendar=args.calendar)
     market_data = synchronize_start_dates(market_data, start_date)
     calculate_momentum_and_ma(market_data)
     trades, final_balance = simulate_trades(market_data, 10000, max_momentum)
@@ -1,22 +1,6 @@
-import os
 import pandas as pd
 import matplotlib.pyplot as plt
-
-def load_data(directory):
-    market_data = {}
-    if not os.path.exists(directory):
-        raise FileNotFoundError(f"The system cannot find the path specified: {directory}")
-
-    for file in os.listdir(directory):
-        if file.endswith('.csv'):
-            path = os.path.join(directory, file)
-            df = pd.read_csv(path, parse_dates=['Date'], index_col='Date', dayfirst=True)
-            df.index = pd.to_datetime(df.index)
-            df = df[~df.index.duplicated(keep='first')]
-            df = df.sort_index()
-            df = df.asfreq('D', method='ffill')
-            market_data[file.replace('.csv', '')] = df
-    return market_data
+from market_data import load_data, trading_dates
 
 def synchronize_start_dates(market_data, start_date):
     for market, df in market_data.items():
@@ -34,8 +18,7 @@ def simulate_trades(market_data, initial_assets=10000):
     trades = []
     current_position = None
 
-    all_dates = pd.date_range(start=min(df.index.min() for df in market_data.values()),
-                              end=max(df.index.max() for df in market_data.values()))
+    all_dates = trading_dates(market_data)
 
     for date in all_dates:
         if not all(date in df.index for df in market_data.values()):
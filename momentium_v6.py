@@ -1,23 +1,11 @@
-import os
 import pandas as pd
 import matplotlib.pyplot as plt
 import argparse
-
-def load_data(directory):
-    market_data = {}
-    if not os.path.exists(directory):
-        raise FileNotFoundError(f"The system cannot find the path specified: {directory}")
-
-    for file in os.listdir(directory):
-        if file.endswith('.csv'):
-            path = os.path.join(directory, file)
-            df = pd.read_csv(path, parse_dates=['Date'], index_col='Date', dayfirst=True)
-            df.index = pd.to_datetime(df.index)
-            df = df[~df.index.duplicated(keep='first')]
-            df = df.sort_index()
-            df = df.asfreq('D', method='ffill')
-            market_data[file.replace('.csv', '')] = df
-    return market_data
+import numpy as np
+from market_data import CALENDARS, load_data, memory_savings, trading_dates
+from price_panel import PricePanel
+from indicators import highest_abs_index, momentum_and_ma, rolling_mean_2d
+from genetic_search import evolve
 
 def synchronize_start_dates(market_data, start_date):
     if start_date == None:
@@ -37,8 +25,7 @@ def simulate_trades(market_data, initial_assets=10000):
     trades = []
     current_position = None
 
-    all_dates = pd.date_range(start=min(df.index.min() for df in market_data.values()),
-                              end=max(df.index.max() for df in market_data.values()))
+    all_dates = trading_dates(market_data)
 
     for date in all_dates:
         if not all(date in df.index for df in market_data.values()):
@@ -77,6 +64,131 @@ def simulate_trades(market_data, initial_assets=10000):
 
     return trades, balance
 
+def calculate_panel_momentum_and_ma(panel, window=14, ma_window=None):
+    """ Vectorised calculate_momentum_and_ma for every symbol of a PricePanel at once, ma_window defaults to window. """
+    momentum, ma, _ = momentum_and_ma(panel.field('Close'), window, panel.valid)
+    if ma_window is not None and ma_window != window:
+        ma = rolling_mean_2d(panel.field('Close'), ma_window, panel.valid)
+    panel.add_field('Momentum', momentum)
+    panel.add_field('MA', ma)
+    return panel
+
+def simulate_trades_panel(panel, initial_assets=10000, max_momentum=0):
+    """
+    simulate_trades on an aligned PricePanel carrying Close, Momentum and MA fields. A non-zero
+    max_momentum skips entries whose |momentum| reaches it, as in momentium_highest_v1.
+    """
+    balance = initial_assets
+    trades = []
+    current_position = None
+
+    close = panel.field('Close')
+    momentum = panel.field('Momentum')
+    ma_values = panel.field('MA')
+    complete_rows = panel.valid.all(axis=1)
+    highest = highest_abs_index(momentum)
+
+    for t in np.flatnonzero(complete_rows):
+        date = panel.dates[t]
+        j = highest[t]
+        highest_market = panel.symbols[j]
+        highest_momentum = momentum[t, j]
+        price = close[t, j]
+        ma = ma_values[t, j]
+
+        if current_position:
+            trade_type, entry_market, entry_price = current_position
+            if entry_market == highest_market:
+                if trade_type == 'Long' and price < ma:
+                    profit = price - entry_price
+                    balance += profit
+                    trades.append((date, entry_market, 'Long Exit', price, profit, balance))
+                    current_position = None
+                elif trade_type == 'Short' and price > ma:
+                    profit = entry_price - price
+                    balance += profit
+                    trades.append((date, entry_market, 'Short Exit', price, profit, balance))
+                    current_position = None
+            continue
+
+        if max_momentum != 0 and not max_momentum > abs(highest_momentum):
+            continue
+        if highest_momentum > 0 and price > ma:
+            current_position = ('Long', highest_market, price)
+            trades.append((date, highest_market, 'Long Entry', price, 0, balance))
+        elif highest_momentum < 0 and price < ma:
+            current_position = ('Short', highest_market, price)
+            trades.append((date, highest_market, 'Short Entry', price, 0, balance))
+
+    return trades, balance
+
+def simulate_population_panel(panel, population, initial_assets=10000):
+    """
+    simulate_trades_panel for a (individuals x 3) matrix of (momentum window, MA window,
+    max momentum) rows at once, every individual's position advancing together date by date.
+    Returns the vector of final balances.
+    """
+    population = np.asarray(population, dtype=np.float64)
+    momentum_windows = population[:, 0].astype(np.int64)
+    ma_windows = population[:, 1].astype(np.int64)
+    max_momentum = population[:, 2]
+
+    close = panel.field('Close')
+    rows = np.flatnonzero(panel.valid.all(axis=1))
+    close_rows = close[rows]
+    highest = np.empty((len(rows), len(population)), dtype=np.int64)
+    highest_momentum = np.empty((len(rows), len(population)))
+    for window in np.unique(momentum_windows):
+        members = momentum_windows == window
+        momentum, _, window_highest = momentum_and_ma(close, window, panel.valid)
+        highest[:, members] = window_highest[rows, None]
+        highest_momentum[:, members] = np.take_along_axis(momentum[rows], window_highest[rows, None], axis=1)
+    ma = np.empty((len(rows), len(population)))
+    for window in np.unique(ma_windows):
+        members = ma_windows == window
+        ma[:, members] = np.take_along_axis(rolling_mean_2d(close, window, panel.valid)[rows], highest[:, members], axis=1)
+    price = np.take_along_axis(close_rows, highest, axis=1)
+    # NaN momentum never passes the cap, the same as the scalar comparison
+    allowed = (max_momentum == 0) | (max_momentum > np.abs(highest_momentum))
+
+    balances = np.full(len(population), initial_assets, dtype=np.float64)
+    position = np.zeros(len(population), dtype=np.int8)
+    entry_market = np.full(len(population), -1, dtype=np.int64)
+    entry_price = np.zeros(len(population))
+    for r in range(len(rows)):
+        flat = position == 0
+        same_market = ~flat & (entry_market == highest[r])
+        long_exit = same_market & (position == 1) & (price[r] < ma[r])
+        short_exit = same_market & (position == -1) & (price[r] > ma[r])
+        balances[long_exit] += price[r, long_exit] - entry_price[long_exit]
+        balances[short_exit] += entry_price[short_exit] - price[r, short_exit]
+        position[long_exit | short_exit] = 0
+
+        # Only individuals flat before this date may enter, an exit ends the date
+        long_entry = flat & allowed[r] & (highest_momentum[r] > 0) & (price[r] > ma[r])
+        short_entry = flat & allowed[r] & ~long_entry & (highest_momentum[r] < 0) & (price[r] < ma[r])
+        position[long_entry] = 1
+        position[short_entry] = -1
+        entering = long_entry | short_entry
+        entry_market[entering] = highest[r, entering]
+        entry_price[entering] = price[r, entering]
+    return balances
+
+def optimize_strategy_genetic(panel, initial_assets=10000, momentum_window_range=(2, 60), ma_window_range=(2, 60), max_momentum_range=(0, 30), max_momentum_step=0.5, population_size=64, generations=50, elite=4, seed=0, time_budget=None):
+    """ Genetic search of (momentum window, MA window, max momentum), each generation simulated in one simulate_population_panel call. """
+    space = [
+        range(momentum_window_range[0], momentum_window_range[1] + 1),
+        range(ma_window_range[0], ma_window_range[1] + 1),
+        np.arange(max_momentum_range[0], max_momentum_range[1] + max_momentum_step, max_momentum_step),
+    ]
+
+    def report(generation, best_params, best_fitness, evaluations, rate):
+        momentum_window, ma_window, max_momentum = best_params
+        print(f"[-] Generation {generation}: best balance {best_fitness:.2f} (momentum window={momentum_window}, MA window={ma_window}, max momentum={max_momentum:g}), {evaluations} evaluations, {rate:,.0f} evaluations/s")
+
+    best_params, best_balance, _ = evolve(space, lambda population: simulate_population_panel(panel, population, initial_assets), population_size=population_size, generations=generations, elite=elite, seed=seed, time_budget=time_budget, on_generation=report)
+    return best_params, best_balance
+
 def plot_results(market_data, trades):
     """ Plot trading results, momentum, MA, and balance over time. """
     trades_df = pd.DataFrame(trades, columns=['Date', 'Symbol', 'TradeType', 'Price', 'Profit', 'Balance'])
@@ -153,6 +265,14 @@ def parse_arguments():
 
     # Add arguments
     parser.add_argument("--startday", "-s", help="start day, ex: 2024-04-24")
+    parser.add_argument("--panel", "-p", action="store_true", default=False, help="simulate on the aligned price panel")
+    parser.add_argument("--calendar", "-c", choices=CALENDARS, default="daily", help="bar calendar: daily (forward filled), business, trading or union of trading days")
+    parser.add_argument("--compact", action="store_true", default=False, help="load only Close prices as float32 to save memory")
+    parser.add_argument("--genetic", "-g", action="store_true", default=False, help="search momentum window, MA window and max momentum with a genetic algorithm first")
+    parser.add_argument("--generations", type=int, default=50, help="generations of --genetic")
+    parser.add_argument("--population", type=int, default=64, help="population size of --genetic")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of --genetic")
+    parser.add_argument("--time_budget", type=float, default=None, help="stop --genetic after this many seconds")
 
     args = parser.parse_args()
 
@@ -165,10 +285,26 @@ def main():
     if args.startday != None:
         start_date = pd.Timestamp(args.startday)
 
-    market_data = load_data(directory)
+    if args.compact:
+        market_data = load_data(directory, calendar=args.calendar, columns=['Close'], compact=True)
+        used, full, saved = memory_savings(market_data)
+        print(f"Compact market data: {used / 1e6:.1f} MB instead of {full / 1e6:.1f} MB ({saved / 1e6:.1f} MB saved)")
+    else:
+        market_data = load_data(directory, calendar=args.calendar)
     market_data = synchronize_start_dates(market_data, start_date)
     calculate_momentum_and_ma(market_data)
-    trades, final_balance = simulate_trades(market_data)
+    if args.genetic:
+        panel = PricePanel.from_market_data(market_data, fields=('Close',))
+        (momentum_window, ma_window, max_momentum), best_balance = optimize_strategy_genetic(panel, population_size=args.population, generations=args.generations, seed=args.seed, time_budget=args.time_budget)
+        print(f"Best Parameters: Momentum Window={momentum_window}, MA Window={ma_window}, Max Momentum={max_momentum:g}")
+        print(f"Best Balance: {best_balance:.2f}")
+        panel = calculate_panel_momentum_and_ma(panel, momentum_window, ma_window)
+        trades, final_balance = simulate_trades_panel(panel, max_momentum=max_momentum)
+    elif args.panel:
+        panel = calculate_panel_momentum_and_ma(PricePanel.from_market_data(market_data, fields=('Close',)))
+        trades, final_balance = simulate_trades_panel(panel)
+    else:
+        trades, final_balance = simulate_trades(market_data)
     trades_df = plot_results(market_data, trades)
     trades_df.to_csv('trades_result.csv', index=False)
 
@@ -0,0 +1,82 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from price_panel import PricePanel, attach_shared_panel
+
+# Set once per worker process by _init_worker from the shared panel, so the data is neither
+# re-sent with every chunk nor copied into every worker
+_worker_market_data = None
+
+def _init_worker(handle, from_panel):
+    global _worker_market_data
+    _worker_market_data = from_panel(attach_shared_panel(handle))
+
+def close_panel(market_data):
+    """ The Close prices of a {symbol: DataFrame} market_data as a PricePanel, keeping their dtype. """
+    dtype = np.result_type(*[df['Close'].dtype for df in market_data.values()]) if market_data else np.float64
+    return PricePanel.from_market_data(market_data, fields=('Close',), dtype=dtype)
+
+def _evaluate_chunk(evaluate_chunk, chunk):
+    return list(evaluate_chunk(_worker_market_data, chunk))
+
+def split_grid(parameter_grid, chunk_size):
+    return [parameter_grid[i:i + chunk_size] for i in range(0, len(parameter_grid), chunk_size)]
+
+def parallel_grid_search(evaluate_chunk, market_data, parameter_grid, workers=0, chunk_size=None, on_chunk=None, to_panel=close_panel, from_panel=PricePanel.to_market_data):
+    """
+    Evaluate parameter_grid in chunks across a process pool. evaluate_chunk(market_data, chunk)
+    must be a top-level function returning one profit per parameter set in the chunk.
+
+    market_data is published once in shared memory as the PricePanel to_panel(market_data),
+    only Close prices by default. Each worker maps it and passes from_panel(panel) to
+    evaluate_chunk, so memory stays flat however many workers run. from_panel must be a
+    top-level function and should return views of the panel rather than copies.
+
+    Chunks come back in grid order and each profit only depends on its own parameters,
+    so the results are identical for any number of workers. workers=0 uses every core.
+    on_chunk(chunk, profits) is called as each chunk's results arrive, in grid order.
+    Returns (profits, evaluations per second).
+    """
+    parameter_grid = list(parameter_grid)
+    if workers == 0:
+        workers = os.cpu_count()
+    workers = max(1, workers or 1)
+    if chunk_size is None:
+        # A few chunks per worker keeps them busy when some parameter sets trade more than others
+        chunk_size = max(1, len(parameter_grid) // (workers * 4))
+    chunks = split_grid(parameter_grid, chunk_size)
+
+    start = time.perf_counter()
+    profits = []
+    if workers == 1:
+        results = (list(evaluate_chunk(market_data, chunk)) for chunk in chunks)
+        for chunk, chunk_profits in zip(chunks, results):
+            profits.extend(chunk_profits)
+            if on_chunk is not None:
+                on_chunk(chunk, chunk_profits)
+    else:
+        panel = to_panel(market_data).to_shared_memory()
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(panel.handle, from_panel)) as executor:
+                results = executor.map(_evaluate_chunk, [evaluate_chunk] * len(chunks), chunks)
+                for chunk, chunk_profits in zip(chunks, results):
+                    profits.extend(chunk_profits)
+                    if on_chunk is not None:
+                        on_chunk(chunk, chunk_profits)
+        finally:
+            panel.unlink()
+    elapsed = time.perf_counter() - start
+
+    rate = len(parameter_grid) / elapsed if elapsed > 0 else float('inf')
+    return profits, rate
+
+def best_parameters(parameter_grid, profits):
+    """ The first parameter set with the highest profit, the same pick as the serial strict > loop. """
+    best_profit = -float('inf')
+    best_params = None
+    for params, profit in zip(parameter_grid, profits):
+        if profit > best_profit:
+            best_profit = profit
+            best_params = params
+    return best_params, best_profit
@@ -0,0 +1,206 @@
+import sys
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+import pandas as pd
+
+PRICE_FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+class PricePanel:
+    """ All symbols aligned on one date axis, one (dates x symbols) array per field. """
+
+    def __init__(self, dates, symbols, fields, values, valid):
+        self.dates = pd.DatetimeIndex(dates, name='Date')
+        self.symbols = list(symbols)
+        self.fields = list(fields)
+        self.values = values  # (fields x dates x symbols) block
+        self.valid = valid    # (dates x symbols) bool, True where the symbol has a bar
+        self._field_pos = {field: i for i, field in enumerate(self.fields)}
+        self._symbol_pos = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.handle = None  # set when values and valid live in shared memory
+        self._shm = None
+
+    @classmethod
+    def from_market_data(cls, market_data, fields=PRICE_FIELDS, dtype=np.float64):
+        symbols = list(market_data.keys())
+        dates = pd.DatetimeIndex([])
+        for df in market_data.values():
+            dates = dates.union(df.index)
+
+        values = np.full((len(fields), len(dates), len(symbols)), np.nan, dtype=dtype)
+        valid = np.zeros((len(dates), len(symbols)), dtype=bool)
+        for j, symbol in enumerate(symbols):
+            df = market_data[symbol]
+            rows = dates.get_indexer(df.index)
+            valid[rows, j] = True
+            for i, field in enumerate(fields):
+                if field in df.columns:
+                    values[i, rows, j] = df[field].to_numpy(dtype=dtype)
+        return cls(dates, symbols, fields, values, valid)
+
+    @property
+    def shape(self):
+        return len(self.dates), len(self.symbols)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.valid.nbytes
+
+    def field(self, name):
+        """ (dates x symbols) view of one field, e.g. panel.field('Close'). """
+        return self.values[self._field_pos[name]]
+
+    def symbol_index(self, symbol):
+        return self._symbol_pos[symbol]
+
+    def column(self, symbol, name='Close'):
+        return self.field(name)[:, self._symbol_pos[symbol]]
+
+    def row(self, date, name='Close'):
+        return self.field(name)[self.dates.get_loc(date)]
+
+    def add_field(self, name, array):
+        """ Attach a derived (dates x symbols) array such as Momentum or MA. """
+        array = np.asarray(array, dtype=self.values.dtype)
+        if array.shape != self.shape:
+            raise ValueError(f"Field {name} has shape {array.shape}, expected {self.shape}")
+        if name in self._field_pos:
+            self.values[self._field_pos[name]] = array
+            return
+        self.values = np.concatenate([self.values, array[np.newaxis]], axis=0)
+        self._field_pos[name] = len(self.fields)
+        self.fields.append(name)
+
+    def slice_dates(self, start=None, end=None):
+        """ Rows between start and end (inclusive), sharing memory with this panel. """
+        lo = 0 if start is None else self.dates.searchsorted(pd.Timestamp(start), side='left')
+        hi = len(self.dates) if end is None else self.dates.searchsorted(pd.Timestamp(end), side='right')
+        return PricePanel(self.dates[lo:hi], self.symbols, self.fields, self.values[:, lo:hi], self.valid[lo:hi])
+
+    def symbol_rows(self, symbol):
+        """ The rows where symbol has a bar, as a slice when they are one contiguous run. """
+        rows = np.flatnonzero(self.valid[:, self._symbol_pos[symbol]])
+        if len(rows) == 0:
+            return slice(0, 0)
+        if rows[-1] - rows[0] + 1 == len(rows):
+            return slice(rows[0], rows[-1] + 1)
+        return rows
+
+    def to_market_data(self):
+        """
+        Convert back to the {symbol: DataFrame} layout the scripts use. Symbols whose bars are one
+        contiguous run get columns that view the panel (its shared block included) instead of
+        copies, so drop the frames before close().
+        """
+        market_data = {}
+        for j, symbol in enumerate(self.symbols):
+            rows = self.symbol_rows(symbol)
+            data = {field: self.values[i, rows, j] for i, field in enumerate(self.fields)}
+            market_data[symbol] = pd.DataFrame(data, index=self.dates[rows], copy=False)
+        return market_data
+
+    def to_shared_memory(self, name=None):
+        """
+        Copy values and valid into one OS shared memory block and return a panel backed by it.
+        Pass panel.handle to other processes and call PricePanel.attach(handle) there to map
+        the same block without copying. The creating process must call unlink() when done.
+        """
+        values = np.ascontiguousarray(self.values)
+        size = values.nbytes + self.valid.nbytes
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+        handle = SharedPanelHandle(shm.name, str(values.dtype), values.shape,
+                                   self.dates.asi8.copy(), list(self.symbols), list(self.fields))
+        shared_values, shared_valid = _map_shared_panel(shm, handle)
+        shared_values[...] = values
+        shared_valid[...] = self.valid
+
+        panel = PricePanel(self.dates, self.symbols, self.fields, shared_values, shared_valid)
+        panel._shm = shm
+        panel.handle = handle
+        return panel
+
+    @classmethod
+    def attach(cls, handle):
+        """ Map a panel created by to_shared_memory in another process, zero-copy. """
+        shm = _open_shared_memory(handle.name)
+        values, valid = _map_shared_panel(shm, handle)
+        panel = cls(pd.DatetimeIndex(handle.dates), handle.symbols, handle.fields, values, valid)
+        panel._shm = shm
+        panel.handle = handle
+        return panel
+
+    def close(self):
+        """
+        Drop this process's mapping of the shared block, the panel's values and valid go with it.
+        Raises BufferError, leaving the panel mapped, while frames from to_market_data or other
+        views of the block are still alive.
+        """
+        if self._shm is not None:
+            self.values = self.valid = None
+            try:
+                self._shm.close()
+            except BufferError:
+                # SharedMemory.close releases its buffer before the mmap refuses to close,
+                # the mapping is intact so give it a buffer again and keep the panel usable
+                self._shm._buf = memoryview(self._shm._mmap)
+                self.values, self.valid = _map_shared_panel(self._shm, self.handle)
+                raise BufferError("views of the shared panel are still alive, drop them before close()") from None
+            self._shm = None
+
+    def unlink(self):
+        """ Close and free the shared block, only from the process that created it. Raises like close(). """
+        if self._shm is not None:
+            shm = self._shm
+            self.close()
+            shm.unlink()
+
+
+class SharedPanelHandle:
+    """ Small picklable description of a shared PricePanel, cheap to send to workers. """
+
+    __slots__ = ('name', 'dtype', 'shape', 'dates', 'symbols', 'fields')
+
+    def __init__(self, name, dtype, shape, dates, symbols, fields):
+        self.name = name
+        self.dtype = dtype
+        self.shape = tuple(shape)
+        self.dates = dates
+        self.symbols = symbols
+        self.fields = fields
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+
+_attached_panels = {}
+
+def _map_shared_panel(shm, handle):
+    # frombuffer holds a buffer export for as long as any view of the arrays lives, which is
+    # what lets shm.close() refuse instead of unmapping memory that frames still read
+    # (np.ndarray(buffer=...) drops the export and reading after close segfaults)
+    values = np.frombuffer(shm.buf, dtype=np.dtype(handle.dtype), count=int(np.prod(handle.shape))).reshape(handle.shape)
+    valid = np.frombuffer(shm.buf, dtype=bool, count=int(np.prod(handle.shape[1:])), offset=values.nbytes).reshape(handle.shape[1:])
+    return values, valid
+
+def attach_shared_panel(handle):
+    """ Attach once per process and reuse the mapping on later calls, for pool worker functions. """
+    panel = _attached_panels.get(handle.name)
+    if panel is None:
+        panel = PricePanel.attach(handle)
+        _attached_panels[handle.name] = panel
+    return panel
+
+def _open_shared_memory(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Before 3.13 attaching registers the block with the resource tracker, which would unlink
+    # it when a worker exits while the owner still uses it, so skip registration here
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
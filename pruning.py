@@ -0,0 +1,81 @@
+import time
+import numpy as np
+
+class CandidatePruned(Exception):
+    """ Raised from a simulation hook to abandon the current parameter set. """
+
+    def __init__(self, reason, bars_skipped):
+        super().__init__(reason)
+        self.reason = reason
+        self.bars_skipped = bars_skipped
+
+class TradePruner:
+    """
+    Early abort for optimisation loops over one market_data. After every closed trade the
+    candidate is dropped when:
+    - its realised balance fell more than max_drawdown below its peak, or
+    - even gaining every remaining price move it could not beat the best balance so far.
+    The second test is exact: one unit is held at a time, so no strategy makes more from
+    bar t on than the summed |close change| after t, and pruning never changes the best result.
+    """
+
+    def __init__(self, market_data, max_drawdown=None, use_bound=True):
+        self.max_drawdown = max_drawdown
+        self.use_bound = use_bound
+        self.best_balance = -np.inf
+        self.completed = 0
+        self.pruned = {'bound': 0, 'drawdown': 0}
+        self.bars_skipped = 0
+        self.completed_time = 0.0
+
+        # Remaining achievable move after each bar: the rest of this market plus every later market
+        self._markets = list(market_data)
+        self._bars = {market: len(df) for market, df in market_data.items()}
+        self._remaining = {}
+        later = 0.0
+        later_bars = 0
+        self._later_bars = {}
+        for market in reversed(self._markets):
+            moves = np.abs(np.diff(market_data[market]['Close'].to_numpy(dtype=np.float64)))
+            suffix = np.concatenate((np.cumsum(np.nan_to_num(moves)[::-1])[::-1], [0.0]))
+            self._remaining[market] = suffix + later
+            self._later_bars[market] = later_bars
+            later += suffix[0] if len(suffix) else 0.0
+            later_bars += self._bars[market]
+        self._total_bars = later_bars
+
+    def begin(self, initial_balance):
+        """ Start a new candidate. """
+        self._peak = initial_balance
+        self._start = time.perf_counter()
+
+    def hook(self, market):
+        """ The on_exit callback for simulate_positions on market. """
+        def check(bar, balance):
+            self._peak = max(self._peak, balance)
+            bars_skipped = self._bars[market] - bar - 1 + self._later_bars[market]
+            if self.max_drawdown is not None and self._peak - balance > self.max_drawdown:
+                raise CandidatePruned('drawdown', bars_skipped)
+            if self.use_bound and balance + self._remaining[market][bar] <= self.best_balance:
+                raise CandidatePruned('bound', bars_skipped)
+        return check
+
+    def complete(self, balance):
+        self.completed += 1
+        self.completed_time += time.perf_counter() - self._start
+        if balance > self.best_balance:
+            self.best_balance = balance
+
+    def prune(self, pruned):
+        self.pruned[pruned.reason] += 1
+        self.bars_skipped += pruned.bars_skipped
+
+    def summary(self):
+        total = self.completed + sum(self.pruned.values())
+        text = (f"Pruning: {self.completed} of {total} candidates completed, {self.pruned['bound']} pruned by the profit bound, "
+                f"{self.pruned['drawdown']} by the drawdown limit; {self.bars_skipped:,} bars skipped")
+        if self.completed and self._total_bars:
+            # Skipped bars valued at the cost per bar of a complete run, an upper estimate since signals are built per market up front
+            saved = self.completed_time / (self.completed * self._total_bars) * self.bars_skipped
+            text += f", at most about {saved:.2f}s saved"
+        return text
@@ -1,10 +1,14 @@
 import pandas as pd
 import numpy as np
 from datetime import timedelta
-from dateutil.parser import parse
 import logging
 from tqdm import tqdm
 import os
+import sys
+
+# date_parsing lives in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from date_parsing import parse_dates
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
@@ -17,17 +21,11 @@ def normalize_positions(input_file, output_file):
             return None
         return (int(position) - 0.5) / int(ran)
 
-    def parse_date(date_str):
-        try:
-            return parse(date_str, dayfirst=True)
-        except:
-            return pd.NaT
-
     reader = pd.read_csv(input_file, chunksize=250000, encoding='ISO-8859-1')
     date_to_num = {}
     first_chunk = True
     for chunk in tqdm(reader, desc="Processing chunks for normalization"):
-        chunk['date'] = chunk['date'].apply(parse_date)
+        chunk['date'] = parse_dates(chunk['date'])
         dates = chunk['date'].dropna().unique()
         date_to_num.update({date: idx for idx, date in enumerate(sorted(dates), start=len(date_to_num) + 1)})
         chunk['Date_Num'] = chunk['date'].map(date_to_num)
@@ -44,14 +42,8 @@ def normalize_positions(input_file, output_file):
 
 # Step 2: Calculate 90- and 365-day appearance frequencies
 def calculate_appearance_frequencies(input_file, output_file):
-    def parse_date(date_str):
-        try:
-            return parse(date_str, dayfirst=True)
-        except:
-            return pd.NaT
-
     data = pd.read_csv(input_file, encoding='ISO-8859-1', low_memory=False)
-    data['date'] = data['date'].apply(parse_date)
+    data['date'] = parse_dates(data['date'])
     data['horsename'] = data['horsename'].fillna('Unknown').astype(str)
 
     results = []
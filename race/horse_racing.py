@@ -6,12 +6,15 @@ from tqdm import tqdm
 import argparse
 import sys
 import os
-from dateutil.parser import parse
 import time  # Add this import
 # Import necessary libraries for multithreading
 import concurrent.futures
 import threading
 
+# date_parsing lives in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from date_parsing import parse_dates
+
 flag_course = True
 timer_running = True
 data = None
@@ -19,14 +22,6 @@ data = None
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 logger = logging.getLogger()
 
-# Function to parse dates with multiple formats
-def parse_date(date_str):
-    try:
-        # Try parsing with dateutil.parser.parse which is very flexible
-        return parse(date_str, dayfirst=True)  # Assume day comes first in ambiguous dates
-    except:
-        return pd.NaT
-
 # Function to process a single row
 def process_row(row):
     global flag_course
@@ -134,8 +129,8 @@ def main_function(file_path, main_column_name):
 
     # Convert 'date' column to datetime format
     try:
-        # Apply the parse_date function to the 'date' column
-        data['date'] = data['date'].apply(parse_date)
+        # Parse the 'date' column in one vectorised pass
+        data['date'] = parse_dates(data['date'])
 
         # Check for any remaining NaT values
         nat_count = data['date'].isna().sum()
@@ -6,7 +6,10 @@ from tqdm import tqdm
 import argparse
 import sys
 import os
-from dateutil.parser import parse
+
+# date_parsing lives in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from date_parsing import parse_dates
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
@@ -41,16 +44,8 @@ if data.empty:
 
 # Convert 'date' column to datetime format
 try:
-    # Function to parse dates with multiple formats
-    def parse_date(date_str):
-        try:
-            # Try parsing with dateutil.parser.parse which is very flexible
-            return parse(date_str, dayfirst=True)  # Assume day comes first in ambiguous dates
-        except:
-            return pd.NaT
-
-    # Apply the parse_date function to the 'date' column
-    data['date'] = data['date'].apply(parse_date)
+    # Parse the 'date' column in one vectorised pass
+    data['date'] = parse_dates(data['date'])
 
     # Check for any remaining NaT values
     nat_count = data['date'].isna().sum()
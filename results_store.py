@@ -0,0 +1,105 @@
+import json
+import sqlite3
+import hashlib
+import numpy as np
+
+DEFAULT_STORE_PATH = "optimization_results.sqlite"
+
+def data_fingerprint(market_data, *settings):
+    """
+    Hash of the dates and closes of every market plus any other settings the profits
+    depend on (e.g. initial assets). Results are only reused for an identical fingerprint.
+    """
+    digest = hashlib.sha256()
+    for market in sorted(market_data):
+        df = market_data[market]
+        digest.update(market.encode())
+        digest.update(np.ascontiguousarray(df.index.to_numpy(dtype='datetime64[ns]')).view(np.int64).tobytes())
+        close = np.ascontiguousarray(df['Close'].to_numpy())
+        digest.update(str(close.dtype).encode())
+        digest.update(close.tobytes())
+    digest.update(repr(settings).encode())
+    return digest.hexdigest()
+
+def params_key(params):
+    """ Stable text key of a parameter tuple, numpy scalars included (floats round-trip exactly). """
+    return json.dumps([value.item() if isinstance(value, np.generic) else value for value in params])
+
+class ResultsStore:
+    """
+    SQLite table of evaluated parameter sets keyed by (data fingerprint, strategy, parameters).
+    New results are buffered and written batch_size rows per transaction.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, batch_size=100):
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = []
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "fingerprint TEXT NOT NULL, strategy TEXT NOT NULL, params TEXT NOT NULL, total_profit REAL, "
+            "PRIMARY KEY (fingerprint, strategy, params))"
+        )
+        self._connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def load(self, fingerprint, strategy):
+        """ Every stored result for this data and strategy as {params_key: total_profit}. """
+        rows = self._connection.execute(
+            "SELECT params, total_profit FROM results WHERE fingerprint = ? AND strategy = ?",
+            (fingerprint, strategy),
+        )
+        # SQLite stores NaN as NULL
+        return {key: np.nan if profit is None else profit for key, profit in rows}
+
+    def record(self, fingerprint, strategy, params, total_profit):
+        self._pending.append((fingerprint, strategy, params_key(params), float(total_profit)))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def record_many(self, fingerprint, strategy, parameter_sets, total_profits):
+        for params, total_profit in zip(parameter_sets, total_profits):
+            self.record(fingerprint, strategy, params, total_profit)
+
+    def flush(self):
+        if not self._pending:
+            return
+        with self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", self._pending)
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+def cached_profits(results_store, fingerprint, strategy, parameter_grid, evaluate):
+    """
+    Profits for parameter_grid in grid order. Only points missing from results_store (None
+    disables it) are passed to evaluate(pending, on_chunk), which must call on_chunk(chunk, profits)
+    as results arrive, so they are stored as the sweep goes and survive an interruption.
+    Points evaluate never reports, such as pruned candidates, come back as NaN.
+    """
+    parameter_grid = list(parameter_grid)
+    known = {} if results_store is None else results_store.load(fingerprint, strategy)
+    pending = [params for params in parameter_grid if params_key(params) not in known]
+    if results_store is not None:
+        print(f"Results store: {len(parameter_grid) - len(pending)} of {len(parameter_grid)} parameter sets already evaluated")
+
+    def on_chunk(chunk, profits):
+        if results_store is not None:
+            results_store.record_many(fingerprint, strategy, chunk, profits)
+        known.update((params_key(params), profit) for params, profit in zip(chunk, profits))
+
+    try:
+        if pending:
+            evaluate(pending, on_chunk)
+    finally:
+        if results_store is not None:
+            results_store.flush()
+    return [known.get(params_key(params), np.nan) for params in parameter_grid]
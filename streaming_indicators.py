@@ -0,0 +1,189 @@
+# python streaming_indicators.py
+# Feeds every MarketData close through the streaming indicators and compares them with pandas.
+import math
+import argparse
+import numpy as np
+import pandas as pd
+from market_data import load_data
+
+NAN = float('nan')
+
+class RollingMeanStd:
+    """ Rolling mean and sample std over the last `window` bars, O(1) per bar (Welford add/remove). """
+
+    __slots__ = ('window', 'buffer', 'pos', 'filled', 'count', 'nan_count', 'mean', 'm2')
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = [NAN] * window
+        self.pos = 0
+        self.filled = 0
+        self.count = 0      # non-NaN values currently in the window
+        self.nan_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def _add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def _remove(self, x):
+        if self.count == 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        self.count -= 1
+        delta = x - self.mean
+        self.mean -= delta / self.count
+        self.m2 -= delta * (x - self.mean)
+
+    def update(self, x):
+        """ Add one bar, return (mean, std), NaN until the window is full of valid values. """
+        x = float(x)
+        if self.filled == self.window:
+            old = self.buffer[self.pos]
+            if math.isnan(old):
+                self.nan_count -= 1
+            else:
+                self._remove(old)
+        else:
+            self.filled += 1
+        self.buffer[self.pos] = x
+        self.pos = (self.pos + 1) % self.window
+        if math.isnan(x):
+            self.nan_count += 1
+        else:
+            self._add(x)
+
+        if self.filled < self.window or self.nan_count:
+            return NAN, NAN
+        std = math.sqrt(max(self.m2, 0.0) / (self.count - 1)) if self.count > 1 else NAN
+        return self.mean, std
+
+class BollingerBands:
+    """ Streaming MA, BB_Lower and BB_Upper as in calculate_bollinger_bands. """
+
+    __slots__ = ('stats', 'num_std_dev_lower', 'num_std_dev_upper')
+
+    def __init__(self, window, num_std_dev_lower, num_std_dev_upper):
+        self.stats = RollingMeanStd(window)
+        self.num_std_dev_lower = num_std_dev_lower
+        self.num_std_dev_upper = num_std_dev_upper
+
+    def update(self, close):
+        ma, std = self.stats.update(close)
+        return ma, ma - std * self.num_std_dev_lower, ma + std * self.num_std_dev_upper
+
+class Momentum:
+    """ close - close `window` bars earlier, from a ring buffer of the last window + 1 closes. """
+
+    __slots__ = ('window', 'buffer', 'pos', 'filled')
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = [NAN] * (window + 1)
+        self.pos = 0
+        self.filled = 0
+
+    def update(self, close):
+        self.buffer[self.pos] = float(close)
+        self.pos = (self.pos + 1) % (self.window + 1)
+        if self.filled <= self.window:
+            self.filled += 1
+        if self.filled <= self.window:
+            return NAN
+        # After the write, pos points at the oldest close in the ring
+        return self.buffer[self.pos - 1 if self.pos else self.window] - self.buffer[self.pos]
+
+class StreakCounter:
+    """ Current run of consecutive positive and negative closes, as in indicators.consecutive_streaks. """
+
+    __slots__ = ('previous', 'up', 'down')
+
+    def __init__(self):
+        self.previous = NAN
+        self.up = 0
+        self.down = 0
+
+    def update(self, close):
+        close = float(close)
+        diff = close - self.previous
+        self.previous = close
+        if diff > 0:
+            self.up, self.down = self.up + 1, 0
+        elif diff < 0:
+            self.up, self.down = 0, self.down + 1
+        else:
+            # Flat or NaN closes break both streaks
+            self.up, self.down = 0, 0
+        return self.up, self.down
+
+    def consecutive(self, num_consecutive, direction='positive'):
+        if direction == 'positive':
+            return self.up >= num_consecutive
+        return self.down >= num_consecutive
+
+def verify_against_batch(close, window=20, num_std_dev=1.5):
+    """ Run the streaming indicators over a close Series and return the max abs difference to pandas per output. """
+    bands = BollingerBands(window, num_std_dev, num_std_dev)
+    momentum = Momentum(window)
+    streaks = StreakCounter()
+    rows = []
+    for price in close.to_numpy():
+        ma, lower, upper = bands.update(price)
+        up, down = streaks.update(price)
+        rows.append((ma, lower, upper, momentum.update(price), up, down))
+    streaming = pd.DataFrame(rows, index=close.index, columns=['MA', 'BB_Lower', 'BB_Upper', 'Momentum', 'UpStreak', 'DownStreak'])
+
+    std = close.rolling(window=window).std()
+    batch = pd.DataFrame({
+        'MA': close.rolling(window=window).mean(),
+        'Momentum': close.diff(window),
+    })
+    batch['BB_Lower'] = batch['MA'] - std * num_std_dev
+    batch['BB_Upper'] = batch['MA'] + std * num_std_dev
+    batch['UpStreak'] = 0
+    batch['DownStreak'] = 0
+    for n in range(1, 11):
+        # A streak of at least n matches the scripts' rolling-window check for n consecutive closes
+        batch['UpStreak'] += (close.diff() > 0).rolling(window=n).sum().eq(n)
+        batch['DownStreak'] += (close.diff() < 0).rolling(window=n).sum().eq(n)
+    streaming['UpStreak'] = streaming['UpStreak'].clip(upper=10)
+    streaming['DownStreak'] = streaming['DownStreak'].clip(upper=10)
+
+    differences = {}
+    for column in streaming.columns:
+        a = streaming[column].to_numpy(dtype=np.float64)
+        b = batch[column].to_numpy(dtype=np.float64)
+        if not np.array_equal(np.isnan(a), np.isnan(b)):
+            differences[column] = np.inf
+            continue
+        differences[column] = float(np.nanmax(np.abs(a - b))) if (~np.isnan(a)).any() else 0.0
+    return differences
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Check streaming indicators against pandas")
+
+    parser.add_argument("--window", "-w", type=int, default=20, help="Indicator window")
+    parser.add_argument("--tolerance", "-t", type=float, default=1e-6, help="Largest accepted absolute difference")
+
+    args = parser.parse_args()
+
+    return args
+
+def main():
+    args = parse_arguments()
+    market_data = load_data("MarketData")
+    failed = False
+    for market, df in market_data.items():
+        differences = verify_against_batch(df['Close'], window=args.window)
+        worst = max(differences.values())
+        status = 'OK' if worst <= args.tolerance else 'MISMATCH'
+        failed |= status != 'OK'
+        print(f"{market}: {status} " + ", ".join(f"{name}={value:.2e}" for name, value in differences.items()))
+    if failed:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import numpy as np
+
+def _parzen_weights(indices, num_values, bandwidth, prior_weight):
+    """
+    Probability of each of num_values ordered choices under a Gaussian kernel around every
+    observed index, mixed with a uniform prior so unexplored values are never ruled out.
+    """
+    grid = np.arange(num_values)
+    density = np.full(num_values, prior_weight / num_values)
+    if len(indices):
+        kernels = np.exp(-0.5 * ((grid[None, :] - np.asarray(indices)[:, None]) / bandwidth) ** 2)
+        kernels /= kernels.sum(axis=1, keepdims=True)
+        density += kernels.sum(axis=0)
+    return density / density.sum()
+
+def _bandwidth(num_values, num_observations):
+    # Wide while there are few observations, narrowing towards one grid step
+    return max(0.5, num_values / (1.0 + np.sqrt(num_observations)))
+
+def tpe_maximize(space, objective, budget=200, num_startup=20, gamma=0.25, num_candidates=48, batch_size=4, explore=0.5, seed=0):
+    """
+    Tree-structured Parzen Estimator search over a product of ordered value lists.
+
+    space is a list of value sequences, one per parameter (integers or quantised floats).
+    objective(list of parameter tuples) returns one score per tuple; it is called with
+    batch_size points at a time so it can evaluate them together. Every point is evaluated
+    at most once and at most budget points are evaluated. A share explore of the points after
+    the random start-up is drawn uniformly, which keeps the search from settling on the first
+    good basin when some parameters barely change the score. Returns (best_params, best_score,
+    history) with history as (params, score) in evaluation order.
+    """
+    rng = np.random.default_rng(seed)
+    space = [list(values) for values in space]
+    sizes = [len(values) for values in space]
+    budget = min(budget, int(np.prod(sizes, dtype=np.float64)))
+
+    observed_indices = []
+    scores = []
+    seen = set()
+
+    def random_point():
+        return tuple(int(rng.integers(size)) for size in sizes)
+
+    def run(points):
+        params = [tuple(space[d][i] for d, i in enumerate(point)) for point in points]
+        for point, score in zip(points, objective(params)):
+            seen.add(point)
+            observed_indices.append(point)
+            scores.append(np.nan if score is None else float(score))
+
+    while len(scores) < budget:
+        wanted = min(batch_size, budget - len(scores))
+        if len(scores) < num_startup:
+            wanted = min(wanted, num_startup - len(scores))
+            proposals = []
+            while len(proposals) < wanted:
+                point = random_point()
+                if point not in seen and point not in proposals:
+                    proposals.append(point)
+            run(proposals)
+            continue
+
+        # Split observations into the best gamma fraction (at most 25 points) and the rest, NaN scores count as bad
+        ranked = np.argsort(-np.nan_to_num(np.asarray(scores), nan=-np.inf), kind='stable')
+        num_good = min(25, max(1, int(np.ceil(gamma * len(scores)))))
+        indices = np.asarray(observed_indices)
+        good, bad = indices[ranked[:num_good]], indices[ranked[num_good:]]
+
+        # Dimensions are modelled independently, candidates are drawn from the good density
+        candidates = np.empty((num_candidates, len(sizes)), dtype=np.int64)
+        log_ratio = np.zeros(num_candidates)
+        for d, size in enumerate(sizes):
+            good_density = _parzen_weights(good[:, d], size, _bandwidth(size, len(good)), 1.0)
+            bad_density = _parzen_weights(bad[:, d], size, _bandwidth(size, len(bad)), 1.0)
+            candidates[:, d] = rng.choice(size, size=num_candidates, p=good_density)
+            log_ratio += np.log(good_density[candidates[:, d]]) - np.log(bad_density[candidates[:, d]])
+
+        num_random = int(rng.binomial(wanted, explore))
+        proposals = []
+        for c in np.argsort(-log_ratio, kind='stable'):
+            if len(proposals) == wanted - num_random:
+                break
+            point = tuple(int(i) for i in candidates[c])
+            if point not in seen and point not in proposals:
+                proposals.append(point)
+        while len(proposals) < wanted:
+            # Exploration share, or every candidate was already evaluated
+            point = random_point()
+            if point not in seen and point not in proposals:
+                proposals.append(point)
+        run(proposals)
+
+    history = [(tuple(space[d][i] for d, i in enumerate(point)), score) for point, score in zip(observed_indices, scores)]
+    best_params, best_score = None, -np.inf
+    for params, score in history:
+        if score > best_score:
+            best_params, best_score = params, score
+    return best_params, best_score, history
@@ -0,0 +1,159 @@
+# python trade_ledger.py
+# Checks TradeLedger against trade_records and compares its memory and build time with the list of tuples.
+import sys
+import time
+import numpy as np
+import pandas as pd
+from backtest_engine import LONG, SHORT, TRADE_TYPES, random_signal_frame, simulate_positions, trade_records
+
+ENTRY, EXIT = 0, 1
+LEDGER_COLUMNS = ['Date', 'Symbol', 'TradeType', 'Price', 'Profit', 'Balance']
+
+class TradeLedger:
+    """
+    Trades as preallocated columns instead of a list of tuples: int64 nanosecond timestamps,
+    int32 symbol codes, int8 side (LONG/SHORT) and action (ENTRY/EXIT), float64 price, profit
+    and balance. Columns double in size when full, so appends are amortised O(1).
+    """
+
+    def __init__(self, capacity=1024):
+        capacity = max(1, capacity)
+        self.symbols = []
+        self._symbol_codes = {}
+        self._size = 0
+        self._time = np.empty(capacity, dtype=np.int64)
+        self._symbol = np.empty(capacity, dtype=np.int32)
+        self._side = np.empty(capacity, dtype=np.int8)
+        self._action = np.empty(capacity, dtype=np.int8)
+        self._price = np.empty(capacity, dtype=np.float64)
+        self._profit = np.empty(capacity, dtype=np.float64)
+        self._balance = np.empty(capacity, dtype=np.float64)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self._columns())
+
+    def _columns(self):
+        return (self._time, self._symbol, self._side, self._action, self._price, self._profit, self._balance)
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self._time)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ('_time', '_symbol', '_side', '_action', '_price', '_profit', '_balance'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def symbol_code(self, market):
+        code = self._symbol_codes.get(market)
+        if code is None:
+            code = self._symbol_codes[market] = len(self.symbols)
+            self.symbols.append(market)
+        return code
+
+    def append(self, date, market, trade_type, price, profit, balance):
+        """ One trade in the (date, market, trade type, price, profit, balance) form of trade_records. """
+        self._reserve(1)
+        i = self._size
+        action = TRADE_TYPES.index(trade_type)
+        self._time[i] = pd.Timestamp(date).as_unit('ns').value
+        self._symbol[i] = self.symbol_code(market)
+        self._side[i] = SHORT if action >= 2 else LONG
+        self._action[i] = action % 2
+        self._price[i] = price
+        self._profit[i] = profit
+        self._balance[i] = balance
+        self._size += 1
+
+    def append_events(self, dates, market, events):
+        """ simulate_positions events of one market, bars looked up in dates. """
+        if not events:
+            return
+        bars, actions, prices, profits, balances = (np.array(column) for column in zip(*events))
+        n = len(bars)
+        self._reserve(n)
+        rows = slice(self._size, self._size + n)
+        self._time[rows] = np.asarray(dates[bars], dtype='datetime64[ns]').view(np.int64)
+        self._symbol[rows] = self.symbol_code(market)
+        # Engine actions are LONG_ENTRY, LONG_EXIT, SHORT_ENTRY, SHORT_EXIT = 0..3
+        self._side[rows] = np.where(actions >= 2, SHORT, LONG)
+        self._action[rows] = actions % 2
+        self._price[rows] = prices
+        self._profit[rows] = profits
+        self._balance[rows] = balances
+        self._size += n
+
+    def trade_type_codes(self):
+        """ Index into TRADE_TYPES of every trade. """
+        return np.where(self._side[:self._size] == SHORT, 2, 0).astype(np.int8) + self._action[:self._size]
+
+    def __iter__(self):
+        """ The trade_records tuples, for code that still walks trades one by one. """
+        dates = self.to_frame()['Date']
+        for i in range(self._size):
+            yield (dates[i], self.symbols[self._symbol[i]], TRADE_TYPES[(2 if self._side[i] == SHORT else 0) + self._action[i]],
+                   float(self._price[i]), float(self._profit[i]), float(self._balance[i]))
+
+    def to_frame(self):
+        """
+        DataFrame with the LEDGER_COLUMNS of the scripts' trade files. Date and the float
+        columns are views of the ledger's arrays, Symbol and TradeType are categoricals over
+        the int codes.
+        """
+        n = self._size
+        return pd.DataFrame({
+            'Date': self._time[:n].view('datetime64[ns]'),
+            'Symbol': pd.Categorical.from_codes(self._symbol[:n], categories=self.symbols if self.symbols else []),
+            'TradeType': pd.Categorical.from_codes(self.trade_type_codes(), categories=list(TRADE_TYPES)),
+            'Price': self._price[:n],
+            'Profit': self._profit[:n],
+            'Balance': self._balance[:n],
+        }, copy=False)
+
+    def to_csv(self, path):
+        """ Same layout as the scripts' trades.csv: Date index then the other columns. """
+        self.to_frame().set_index('Date').to_csv(path)
+
+    def to_parquet(self, path):
+        """ Needs pandas' optional parquet engine (pyarrow or fastparquet). """
+        self.to_frame().to_parquet(path, index=False)
+
+def main():
+    rng = np.random.default_rng(0)
+    markets = {f'M{i}': random_signal_frame(20000, 0.2, rng) for i in range(20)}
+
+    start = time.perf_counter()
+    records = []
+    for market, df in markets.items():
+        events, _ = simulate_positions(df['Close'], df['LongEntry'], df['LongExit'], df['ShortEntry'], df['ShortExit'])
+        records.extend(trade_records(df.index, market, events))
+    list_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ledger = TradeLedger()
+    for market, df in markets.items():
+        events, _ = simulate_positions(df['Close'], df['LongEntry'], df['LongExit'], df['ShortEntry'], df['ShortExit'])
+        ledger.append_events(df.index, market, events)
+    ledger_time = time.perf_counter() - start
+
+    # Containers, tuples and every boxed value they hold (interned strings are shared)
+    list_bytes = sys.getsizeof(records) + sum(sys.getsizeof(record) + sum(sys.getsizeof(value) for value in record[:1] + record[3:]) for record in records)
+    expected = pd.DataFrame(records, columns=LEDGER_COLUMNS)
+    frame = ledger.to_frame()
+    matches = all((frame[column].astype(expected[column].dtype) == expected[column]).all() for column in LEDGER_COLUMNS)
+    shared = all(np.shares_memory(frame[column].to_numpy(), column_array) for column, column_array in (('Price', ledger._price), ('Balance', ledger._balance)))
+    print(f"{len(ledger)} trades, matches trade_records: {matches}, frame shares ledger memory: {shared}")
+    print(f"list of tuples: {list_time:.2f}s, {list_bytes / 1e6:.1f} MB")
+    row_bytes = sum(column.itemsize for column in ledger._columns())
+    print(f"ledger:         {ledger_time:.2f}s, {ledger.nbytes / 1e6:.1f} MB allocated ({len(ledger) * row_bytes / 1e6:.1f} MB used)")
+
+if __name__ == '__main__':
+    main()